@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Compare the text and the binary formats of the phonetic search index, i.e.
+# the load time and the query latency of both.
+#
+# Usage: build-aux/benchmarks/lafzi_index.py [ROUNDS]
+
+from os import path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import gc
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '../..'))
+
+from src.lafzi import BinaryPhoneticIndex
+from src.lafzi import TextPhoneticIndex
+from src.lafzi import compile_index
+
+db_dirpath = path.join(path.dirname(path.abspath(__file__)), '../../src/db')
+termlist_filepath = path.join(db_dirpath, 'lafzi_termlist.txt')
+postlist_filepath = path.join(db_dirpath, 'lafzi_postlist.txt')
+
+# Already transliterated by `latin2phonetic()`
+queries = ['BISMILAH', 'XALHAMDULILAHIRABILALAMIN', 'KULHUWALAHUXAHAD',
+           'XINALAZINA', 'YAYUHALAZINAMANU', 'RAHMAN', 'WALXASRI',
+           'KUNFAYAKUN']
+
+rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+
+def measure(
+        label: str,
+        load) -> None:
+    load_times = []
+    first_query_times = []
+    query_times = []
+    for _ in range(rounds):
+        gc.collect()
+        start = perf_counter()
+        index = load()
+        load_times.append(perf_counter() - start)
+
+        # The first queries on a fresh index include any lazy decoding
+        gc.collect()
+        start = perf_counter()
+        for query in queries:
+            index.search(query, (0.7,))
+        first_query_times.append((perf_counter() - start) / len(queries))
+
+        gc.collect()
+        start = perf_counter()
+        for query in queries:
+            index.search(query, (0.7,))
+        query_times.append((perf_counter() - start) / len(queries))
+
+    print(f'{label:<8}'
+          f'load {min(load_times)*1000:9.2f} ms   '
+          f'first query {min(first_query_times)*1000:7.2f} ms   '
+          f'query {min(query_times)*1000:7.2f} ms')
+
+
+with TemporaryDirectory() as tmp_dirpath:
+    index_filepath = path.join(tmp_dirpath, 'lafzi_index.bin')
+    compile_index(TextPhoneticIndex(termlist_filepath, postlist_filepath),
+                  index_filepath)
+    print(f'text    {path.getsize(postlist_filepath):>9} bytes')
+    print(f'binary  {path.getsize(index_filepath):>9} bytes')
+
+    measure('text',
+            lambda: TextPhoneticIndex(termlist_filepath, postlist_filepath))
+    measure('binary', lambda: BinaryPhoneticIndex(index_filepath))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+# Check the transliteration of latin texts into the Lafzi phonetic code against
+# a golden corpus, then compare its speed to the former implementation which
+# applied every rule in its own pass.
+#
+# Usage: build-aux/benchmarks/latin2phonetic.py [ROUNDS]
+
+from os import path
+from time import perf_counter
+import itertools
+import re
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '../..'))
+
+from src.lafzi import latin2phonetic
+
+corpus_filepath = \
+    path.join(path.dirname(path.abspath(__file__)), 'latin2phonetic.tsv')
+
+rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+
+def latin2phonetic_sequential(latin_text: str) -> str:
+    # Normalise the latin text
+    # make all characters capitalized
+    latin_text = latin_text.upper()
+
+    # replace strips with spaces
+    latin_text = latin_text.replace('-', ' ')
+
+    # remove non-alphabetic characters except ampersands and spaces
+    latin_text = re.sub(r"[^A-Z'`\&\s]", '', latin_text)
+
+    # Transform the latin text
+    # remove repeated adjacent characters
+    latin_text = ''.join(c[0] for c in itertools.groupby(latin_text))
+
+    # remove duplicate adjacent two-letter-consonants
+    latin_text = re.sub(r'(KH|CH|SH|TS|SY|DH|TH|ZH|DH|DZ|GH)+', r'\1',
+                        latin_text)
+
+    # replace the letters O and E since they are not in arabic
+    latin_text = latin_text.replace('O', 'A')
+    latin_text = latin_text.replace('E', 'I')
+
+    # replace the diphthong from non-Arabic to Arabic
+    latin_text = latin_text.replace('AI', 'AY')
+    latin_text = latin_text.replace('AU', 'AW')
+
+    # mark the hamzas
+    latin_text = re.sub(r'^(A|I|U)+', r'X\1', latin_text)
+    latin_text = latin_text.replace(' A', ' XA')
+    latin_text = latin_text.replace(' I', ' XI')
+    latin_text = latin_text.replace(' U', ' XU')
+    latin_text = latin_text.replace('IA', 'IXA')
+    latin_text = latin_text.replace('IU', 'IXU')
+    latin_text = latin_text.replace('UA', 'UXA')
+    latin_text = latin_text.replace('UI', 'UXI')
+
+    # replace the ikhfas (NG)
+    latin_text = re.sub(r'(A|I|U)NG\s?(D|F|J|K|P|Q|S|T|V|Z)+', r'\1N\2',
+                        latin_text)
+
+    # replace the iqlabs
+    latin_text = re.sub(r'N\s?B', 'MB', latin_text)
+
+    # replace the idghams
+    latin_text = latin_text.replace('DUNYA', 'DUN_YA')
+    latin_text = latin_text.replace('BUNYAN', 'BUN_YAN')
+    latin_text = latin_text.replace('QINWAN', 'KIN_WAN')
+    latin_text = latin_text.replace('KINWAN', 'KIN_WAN')
+    latin_text = latin_text.replace('SINWAN', 'SIN_WAN')
+    latin_text = latin_text.replace('SHINWAN', 'SIN_WAN')
+    latin_text = re.sub(r'N\s?(N|M|L|R|Y|W)+', r'\1', latin_text)
+    latin_text = latin_text.replace('DUN_YA', 'DUNYA')
+    latin_text = latin_text.replace('BUN-YAN', 'BUNYAN')
+    latin_text = latin_text.replace('KIN_WAN', 'KINWAN')
+    latin_text = latin_text.replace('SIN_WAN', 'SINWAN')
+
+    # replace two-letter-consonants
+    latin_text = latin_text.replace('KH', 'H')
+    latin_text = latin_text.replace('CH', 'H')
+    latin_text = latin_text.replace('SH', 'S')
+    latin_text = latin_text.replace('TS', 'S')
+    latin_text = latin_text.replace('SY', 'S')
+    latin_text = latin_text.replace('DH', 'D')
+    latin_text = latin_text.replace('ZH', 'Z')
+    latin_text = latin_text.replace('DZ', 'Z')
+    latin_text = latin_text.replace('TH', 'T')
+    latin_text = latin_text.replace('NGA', 'XNGA')
+    latin_text = latin_text.replace('NGI', 'XNGI')
+    latin_text = latin_text.replace('NGU', 'XNGU')
+    latin_text = latin_text.replace('GH', 'G')
+
+    # replace one-letter-consonants
+    latin_text = latin_text.replace('GH', 'G')
+    latin_text = latin_text.replace("'", 'X')
+    latin_text = latin_text.replace("`", 'X')
+    latin_text = latin_text.replace("Q", 'K')
+    latin_text = latin_text.replace("K", 'K')
+    latin_text = latin_text.replace("F", 'F')
+    latin_text = latin_text.replace("V", 'F')
+    latin_text = latin_text.replace("P", 'F')
+    latin_text = latin_text.replace("J", 'Z')
+    latin_text = latin_text.replace("Z", 'Z')
+
+    # remove spaces
+    latin_text = latin_text.replace(' ', '')
+
+    return latin_text
+
+with open(corpus_filepath, 'r') as corpus_file:
+    corpus = [line.rstrip('\n').split('\t') for line in corpus_file
+              if not line.startswith('#')]
+
+n_failures = 0
+for latin_text, phonetic_code in corpus:
+    for function in (latin2phonetic, latin2phonetic_sequential):
+        if function(latin_text) != phonetic_code:
+            print(f'{function.__name__}({latin_text!r}) = '
+                  f'{function(latin_text)!r}, expected {phonetic_code!r}')
+            n_failures += 1
+print(f'{len(corpus)} texts checked, {n_failures} failures')
+
+
+def measure(
+        label: str,
+        function) -> None:
+    times = []
+    for _ in range(rounds):
+        start = perf_counter()
+        for latin_text, _ in corpus:
+            function(latin_text)
+        times.append((perf_counter() - start) / len(corpus))
+    print(f'{label:<12}{min(times)*1e6:8.2f} us per text')
+
+
+measure('sequential', latin2phonetic_sequential)
+measure('rules', latin2phonetic.__wrapped__)
+latin2phonetic.cache_clear()
+measure('cached', latin2phonetic)
+
+sys.exit(1 if n_failures else 0)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# Compare the costs of a page in night mode: inverting its colors byte by byte
+# in Python as formerly done, with `invert_page()`, and taking the inverted page
+# from the cache. The page image is either given, or a synthetic one of the
+# size of the pages of the standard Musshaf.
+#
+# Usage: build-aux/benchmarks/night_mode.py [PAGE_IMAGE] [ROUNDS]
+
+from os import path
+from time import perf_counter
+import sys
+
+import gi
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import GdkPixbuf
+from gi.repository import GLib
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '../..'))
+
+from src.page import PageCache
+from src.page import invert_page
+
+page_image_filepath = sys.argv[1] if len(sys.argv) > 1 else None
+rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+if page_image_filepath:
+    page_image = GdkPixbuf.Pixbuf.new_from_file(page_image_filepath)
+else:
+    page_image = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, False, 8,
+                                      1240, 1800)
+    page_image.fill(0xf6f1e4ff)
+
+
+def invert_page_sequential(
+        page_image: GdkPixbuf.Pixbuf) -> GdkPixbuf.Pixbuf:
+    page_image_bytes = bytearray(page_image.get_pixels())
+    page_image_bytes = bytearray(x ^ 0xff for x in page_image_bytes)
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(page_image_bytes), GdkPixbuf.Colorspace.RGB,
+        False, 8, page_image.get_width(), page_image.get_height(),
+        page_image.get_rowstride())
+
+
+def invert_page_cached(
+        page_image: GdkPixbuf.Pixbuf) -> GdkPixbuf.Pixbuf:
+    key = ('benchmark', 1, page_image.get_width(), 'inverted')
+    inverted_image = PageCache.lookup(key)
+    if inverted_image is None:
+        inverted_image = invert_page(page_image)
+        PageCache.put(key, inverted_image)
+    return inverted_image
+
+
+def measure(
+        function,
+        page_image: GdkPixbuf.Pixbuf) -> float:
+    times = []
+    for _ in range(rounds):
+        start = perf_counter()
+        function(page_image)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+n_failures = 0
+for page_scale in (0.4, 0.6, 1.0):
+    scaled_image = page_image.scale_simple(
+        round(page_image.get_width() * page_scale),
+        round(page_image.get_height() * page_scale),
+        GdkPixbuf.InterpType.BILINEAR)
+
+    # Rows may be padded, so compare the pixels of every row only
+    n_row_bytes = scaled_image.get_width() * scaled_image.get_n_channels()
+    expected_pixels = invert_page_sequential(scaled_image).get_pixels()
+    inverted_pixels = invert_page(scaled_image).get_pixels()
+    for row in range(scaled_image.get_height()):
+        start = row * scaled_image.get_rowstride()
+        if expected_pixels[start:start+n_row_bytes] \
+                != inverted_pixels[start:start+n_row_bytes]:
+            print(f'invert_page() differs at scale {page_scale}, row {row}')
+            n_failures += 1
+            break
+
+    print(f'{scaled_image.get_width()}x{scaled_image.get_height()}  '
+          f'sequential {measure(invert_page_sequential, scaled_image)*1000:9.2f}'
+          f' ms   invert_page {measure(invert_page, scaled_image)*1000:7.2f}'
+          f' ms   cached {measure(invert_page_cached, scaled_image)*1000:7.3f}'
+          ' ms')
+
+sys.exit(1 if n_failures else 0)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+# Measure the search backends tried by `SearchPopover.find()`, without the GTK
+# app: the full-text index of the ayah texts merged with the trigram index, the
+# phonetic index, and the tarajem, both through their full-text index and for
+# the whole words, i.e. also checked by REGEXP. The tarajem are a synthetic
+# database generated with a fixed seed. The latency percentiles are given per
+# backend and per query length, then the results are checked against a golden
+# set, so that a speedup cannot silently change them.
+#
+# Usage: build-aux/benchmarks/search.py [ROUNDS] [--update-golden]
+
+from os import path
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '../..'))
+
+from src import constants as const
+from src.lafzi import PhoneticIndex
+from src.lafzi import latin2phonetic
+from src.model import Connection
+from src.model import Metadata
+from src.model import SearchIndex
+from src.model import Tarajem
+from src.model import TrigramIndex
+
+golden_filepath = path.join(path.dirname(path.abspath(__file__)), 'search.tsv')
+
+args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+rounds = int(args[0]) if args else 5
+is_updating_golden = '--update-golden' in sys.argv
+
+# The synthetic tarajem: a translation with a short text per ayah, and a tafsir
+# with a long one
+tarajem_sizes = {'synthetic_translation': (8, 40),
+                 'synthetic_tafsir': (150, 600)}
+vocabulary = (
+    'the and of to in is that he who they you those we his for a not them '
+    'are their is with it be from say your will indeed upon have our lord '
+    'allah god people believe believers disbelieve earth heavens day '
+    'mercy merciful forgiving knowing wise punishment reward garden fire '
+    'messenger book signs truth guidance prayer charity patience moses '
+    'abraham noah jesus mary pharaoh israel worship fear remember '
+    'send sent down revealed created creation water night light darkness '
+    'Allah Lord Day Book Messenger').split()
+
+queries = {
+    'imlaei': ['الله', 'الرحمن', 'بسم الله', 'الحمد لله رب',
+               'قل هو الله أحد', 'ان الله على كل شيء قدير', 'لا', 'يا أيها'],
+    'trigram': ['لحمد', 'رحيم', 'حمن الر', 'ستقيم', 'كتاب لا ريب',
+                'سماوات والارض'],
+    'phonetic': ['bismillah', 'alhamdulillah', 'qul huwallahu ahad',
+                 'innalladzina', 'ya ayyuhalladzina amanu', 'rahman',
+                 'wal asri', 'kun fayakun', 'ar-rahmanir-rahim'],
+    'tarajem': ['god', 'mercy', 'the day', 'lord of', 'Allah',
+                'believe in', 'the messenger of allah', 'fire', 'ercy'],
+}
+
+
+def get_length_class(query: str) -> str:
+    if len(query) <= 4:
+        return 'short'
+    if len(query) <= 12:
+        return 'medium'
+    return 'long'
+
+
+def create_tarajem(filepath: str) -> None:
+    rng = random.Random(0)
+    connection = sqlite3.connect(filepath)
+    with Metadata() as metadata:
+        metadata.cursor.execute('SELECT id, sura, aya FROM texts ORDER BY id')
+        ayahs = metadata.cursor.fetchall()
+    for tarajem_name, (min_words, max_words) in tarajem_sizes.items():
+        connection.execute(f'''CREATE TABLE {tarajem_name} (
+                               id   INT(4) PRIMARY KEY
+                                           NOT NULL,
+                               sura INT(3) NOT NULL,
+                               aya  INT(3) NOT NULL,
+                               text TEXT   NOT NULL
+                           );''')
+        connection.executemany(
+            f'INSERT INTO {tarajem_name} VALUES (?, ?, ?, ?)',
+            [(id, sura, aya,
+              ' '.join(rng.choice(vocabulary) for _ in
+                       range(rng.randint(min_words, max_words))) + '.')
+             for id, sura, aya in ayahs])
+    connection.commit()
+    connection.close()
+
+
+def search_imlaei(query: str) -> list:
+    with SearchIndex() as index:
+        results = index.get_ayah_texts(query)
+    surayas = {result[:2] for result in results}
+    return results + [result for result in search_trigram(query)
+                      if result[:2] not in surayas]
+
+
+def search_trigram(query: str) -> list:
+    with Metadata() as metadata:
+        return metadata.get_ayah_texts(query)
+
+
+def search_phonetic(query: str) -> list:
+    matched_docs = PhoneticIndex.get().search(latin2phonetic(query),
+                                              (0.9, 0.8, 0.7))
+    with Metadata() as metadata:
+        return metadata.get_ayah_texts_by_ids(
+            [matched_doc['document-id'] for matched_doc in matched_docs])
+
+
+def search_tarajem_index(tarajem_name: str):
+    def search(query: str) -> list:
+        with SearchIndex() as index:
+            results = index.get_tarajem_texts(tarajem_name, query)
+        # As in `SearchPopover.find_tarajem()`, the texts where the query is
+        # within a word come after the ranked ones
+        surayas = {result[:2] for result in results}
+        with Tarajem() as tarajem:
+            return results + [result for result
+                              in tarajem.get_tarajem_texts(tarajem_name, query)
+                              if result[:2] not in surayas]
+    return search
+
+
+def search_tarajem_whole_word(tarajem_name: str):
+    def search(query: str) -> list:
+        with Tarajem() as tarajem:
+            return tarajem.get_tarajem_texts(tarajem_name, query,
+                                             match_whole_word=True)
+    return search
+
+
+def search_all(query: str) -> list:
+    """Try the backends in the order of `SearchPopover.find()`."""
+    results = search_imlaei(query) or search_phonetic(query)
+    for tarajem_name in tarajem_sizes:
+        if results:
+            break
+        results = search_tarajem_index(tarajem_name)(query)
+    return results
+
+
+def measure(
+        label: str,
+        search,
+        queries: list) -> dict:
+    """Print the latency percentiles, and return the results of every query
+
+    The first search of every query is left out of the percentiles, as it
+    includes loading the indexes.
+    """
+    results = {query: search(query) for query in queries}
+    times = {}
+    for _ in range(rounds):
+        for query in queries:
+            start = perf_counter()
+            search(query)
+            times.setdefault(get_length_class(query), []) \
+                .append(perf_counter() - start)
+    for length_class in ('short', 'medium', 'long'):
+        if length_class not in times:
+            continue
+        samples = times[length_class] * 2 \
+            if len(times[length_class]) < 2 else times[length_class]
+        percentiles = quantiles(samples, n=100, method='inclusive')
+        print(f'{label:<36}{length_class:<8}'
+              f'p50 {percentiles[49]*1000:8.2f} ms   '
+              f'p95 {percentiles[94]*1000:8.2f} ms   '
+              f'p99 {percentiles[98]*1000:8.2f} ms')
+    return results
+
+
+def format_results(results: list) -> str:
+    """Sum up the results as their count and their first ayahs."""
+    return f'{len(results)}\t' + \
+        ' '.join(f'{sura}:{aya}' for sura, aya, _ in results[:5])
+
+
+with TemporaryDirectory() as tmp_dirpath:
+    const.USER_DATA_PATH = tmp_dirpath
+    const.USER_CACHE_PATH = tmp_dirpath
+    create_tarajem(path.join(tmp_dirpath, 'tarajem.db'))
+
+    # Build the indexes beforehand, as done once by the app
+    start = perf_counter()
+    with SearchIndex() as index:
+        index.create_texts_index()
+        for tarajem_name in tarajem_sizes:
+            index.create_tarajem_index(tarajem_name)
+    TrigramIndex.get('texts')
+    PhoneticIndex.get()
+    print(f'indexing {(perf_counter() - start)*1000:.2f} ms')
+
+    backends = [('imlaei', search_imlaei, queries['imlaei']),
+                ('trigram', search_trigram, queries['trigram']),
+                ('phonetic', search_phonetic, queries['phonetic'])]
+    for tarajem_name in tarajem_sizes:
+        backends.append((f'{tarajem_name}-index',
+                         search_tarajem_index(tarajem_name),
+                         queries['tarajem']))
+        backends.append((f'{tarajem_name}-whole-word',
+                         search_tarajem_whole_word(tarajem_name),
+                         queries['tarajem']))
+    backends.append(('all', search_all,
+                     [query for label in ('imlaei', 'phonetic', 'tarajem')
+                      for query in queries[label]]))
+
+    golden = []
+    for label, search, backend_queries in backends:
+        results = measure(label, search, backend_queries)
+        golden += [f'{label}\t{query}\t{format_results(results[query])}'
+                   for query in backend_queries]
+
+    # Close the connections before the database files are removed
+    Connection.close()
+
+if is_updating_golden:
+    with open(golden_filepath, 'w') as golden_file:
+        golden_file.write('# backend\tquery\tnumber of results\tfirst results'
+                          '\n')
+        golden_file.write(''.join(f'{line}\n' for line in golden))
+    sys.exit(0)
+
+with open(golden_filepath, 'r') as golden_file:
+    expected = [line.rstrip('\n') for line in golden_file
+                if not line.startswith('#')]
+
+n_failures = 0
+for line, expected_line in zip(golden, expected):
+    if line != expected_line:
+        print(f'got      {line!r}\nexpected {expected_line!r}')
+        n_failures += 1
+if len(golden) != len(expected):
+    print(f'{len(golden)} queries searched, {len(expected)} expected')
+    n_failures += 1
+print(f'{len(golden)} queries checked, {n_failures} failures')
+
+sys.exit(1 if n_failures else 0)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+# Build the text files of the phonetic search index from a vowelled Quran text,
+# i.e. the termlist and the postlist read by `TextPhoneticIndex` and compiled
+# by `compile_index()`. The texts of the Musshaf database have no vowel marks,
+# so the ayahs are read from a text file in the Tanzil format, one
+# `surah|ayah|text` line per ayah, either in the simple or the Uthmani script.
+# The ayahs are given their document ID from the Musshaf database, so the text
+# file may hold some of them only.
+#
+# The ayahs are transliterated in parallel, yet the output only depends on the
+# input: the terms are sorted, and so are the documents and the positions of
+# every term. As in the shipped index, a tri-gram overlapping the previous one
+# of its kind, e.g. the second ABA of ABABA, is counted in the frequency but
+# its position is left out.
+#
+# The shipped index also holds the variant readings of some ayahs, which
+# cannot be derived from their text, so it is kept rather than rebuilt. With
+# --check, nothing is written: the transliteration of every given ayah is
+# checked against the existing index instead, and the exit status tells
+# whether all of them are found there at their positions. The sample ayahs
+# in both scripts are checked by:
+#
+#     build-aux/build_lafzi_index.py --check build-aux/lafzi_sample.txt \
+#         src/db/lafzi_termlist.txt src/db/lafzi_postlist.txt
+#
+# Usage: build-aux/build_lafzi_index.py [--check] [--jobs N]
+#            QURAN_TEXT TERMLIST POSTLIST
+
+from argparse import ArgumentParser
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+import sqlite3
+import sys
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))
+
+from src.lafzi import TextPhoneticIndex
+from src.lafzi import arabic2phonetic
+
+database_filepath = path.join(path.dirname(path.abspath(__file__)),
+                              '../src/db/main.db')
+
+
+def read_ayahs(quran_filepath: str) -> list:
+    """Read the (document ID, surah, ayah, text) of the ayahs, in the order
+    of the text file"""
+    connection = sqlite3.connect(database_filepath)
+    document_ids = {(surah_no, ayah_no): document_id for
+                    document_id, surah_no, ayah_no in
+                    connection.execute('SELECT id, sura, aya FROM texts')}
+    connection.close()
+
+    ayahs = []
+    with open(quran_filepath, 'r', encoding='utf-8') as quran_file:
+        for line in quran_file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            surah_no, ayah_no, text = line.split('|', 2)
+            surah_no, ayah_no = int(surah_no), int(ayah_no)
+            ayahs.append((document_ids[(surah_no, ayah_no)], surah_no, ayah_no,
+                          text))
+    return ayahs
+
+
+def get_postings(
+        phonetic_text: str) -> dict:
+    """Map every tri-gram of a document to its frequency and its 1-based
+    positions"""
+    postings = {}
+    for idx in range(len(phonetic_text) - 2):
+        posting = postings.setdefault(phonetic_text[idx:idx+3], [0, []])
+        posting[0] += 1
+        if not posting[1] \
+                or idx + 1 - posting[1][-1] >= 3:
+            posting[1].append(idx + 1)
+    return postings
+
+
+def build_index(
+        documents: list) -> dict:
+    """Map every tri-gram to the frequency and the positions by document,
+    from (document ID, phonetic text) pairs"""
+    index = {}
+    for document_id, phonetic_text in documents:
+        for term, posting in get_postings(phonetic_text).items():
+            index.setdefault(term, {})[document_id] = posting
+    return index
+
+
+def format_index(
+        index: dict) -> tuple:
+    termlist = []
+    postlist = []
+    offset = 0
+    for term in sorted(index):
+        line = ';'.join(f'{document_id}:{frequency}:'
+                        f'{",".join(map(str, positions))}'
+                        for document_id, (frequency, positions)
+                        in sorted(index[term].items()))
+        termlist.append(f'{term}|{offset}\n')
+        postlist.append(f'{line}\n')
+        offset += len(line) + 1
+    return ''.join(termlist).encode(), ''.join(postlist).encode()
+
+
+def check_index(
+        ayahs: list,
+        phonetic_texts: list,
+        termlist_filepath: str,
+        postlist_filepath: str) -> int:
+    """Print the ayahs whose transliteration is not found in the existing
+    index, and return their number"""
+    phonetic_index = TextPhoneticIndex(termlist_filepath, postlist_filepath)
+    n_failures = 0
+    for (document_id, surah_no, ayah_no, _), phonetic_text \
+            in zip(ayahs, phonetic_texts):
+        missing = []
+        for term, (_, positions) in get_postings(phonetic_text).items():
+            indexed_positions = ()
+            postings = phonetic_index.get_postings(term)
+            if postings:
+                document_ids, _, offsets, all_positions = postings
+                idx = bisect_left(document_ids, document_id)
+                if idx < len(document_ids) \
+                        and document_ids[idx] == document_id:
+                    indexed_positions = \
+                        all_positions[offsets[idx]:offsets[idx+1]]
+            missing += [(position, term) for position in positions
+                        if position not in indexed_positions]
+        if missing:
+            position, term = min(missing)
+            print(f'{surah_no}:{ayah_no} {phonetic_text} has {term} at '
+                  f'{position}, which is not indexed', file=sys.stderr)
+            n_failures += 1
+    return n_failures
+
+
+def main() -> int:
+    parser = ArgumentParser(description='Build the phonetic search index.')
+    parser.add_argument('--check', action='store_true',
+                        help='check the existing files instead')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('quran_filepath', metavar='QURAN_TEXT')
+    parser.add_argument('termlist_filepath', metavar='TERMLIST')
+    parser.add_argument('postlist_filepath', metavar='POSTLIST')
+    args = parser.parse_args()
+
+    ayahs = read_ayahs(args.quran_filepath)
+    with ProcessPoolExecutor(args.jobs) as executor:
+        phonetic_texts = list(executor.map(
+            arabic2phonetic, [text for _, _, _, text in ayahs],
+            chunksize=64))
+
+    if args.check:
+        n_failures = check_index(ayahs, phonetic_texts,
+                                 args.termlist_filepath,
+                                 args.postlist_filepath)
+        print(f'{len(ayahs)} ayahs checked, {n_failures} failures')
+        return 1 if n_failures else 0
+
+    termlist, postlist = format_index(build_index(
+        zip([document_id for document_id, _, _, _ in ayahs],
+            phonetic_texts)))
+    for filepath, content in ((args.termlist_filepath, termlist),
+                              (args.postlist_filepath, postlist)):
+        with open(filepath, 'wb') as file:
+            file.write(content)
+    print(f'{len(ayahs)} ayahs, {termlist.count(b"|")} tri-grams')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
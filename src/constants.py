@@ -26,6 +26,9 @@ APPLICATION_VERSION: str = ''
 APPLICATION_ID = 'org.grapik.Quran'
 RESOURCE_PATH = '/org/grapik/Quran'
 USER_DATA_PATH = path.join(GLib.get_user_data_dir(), 'grapik-quran')
+USER_CACHE_PATH = path.join(GLib.get_user_cache_dir(), 'grapik-quran')
 
 PAGE_MARGIN = 20  # in pixel
 PAGE_ZOOM_STEP = 10  # in percent
+PAGE_ZOOM_MIN = 50  # in percent, as in the zoom adjustment of the menu
+PAGE_ZOOM_MAX = 150  # in percent
@@ -0,0 +1,638 @@
+# lafzi.py
+#
+# Copyright 2021 Naufan Rusyda Faikar
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Phonetic search of the Musshaf texts
+
+The phonetic search algorithm and data are credit to Lafzi. The index maps
+every phonetic tri-gram to the postings of the ayahs (documents) containing it,
+i.e. the document ID, the tri-gram frequency in the document and the positions
+of the tri-gram in the document.
+
+The index is shipped as text files, i.e. a termlist of `term|offset` lines and
+a postlist of `document:frequency:position,...;...` lines at the offsets. These
+are generated from a vowelled Quran text by `build-aux/build_lafzi_index.py`,
+see `arabic2phonetic()`. The build compiles them into a binary file, see
+`compile_index()`, which is read through a memory map instead of being parsed.
+The text files remain supported as a fallback.
+
+This module has no dependency on the rest of the application, so that it can
+be run as a script to compile the index:
+
+    python3 lafzi.py termlist.txt postlist.txt index.bin
+"""
+
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from heapq import nlargest
+from mmap import ACCESS_READ
+from mmap import mmap
+from os import path
+from threading import Lock
+from threading import Thread
+import re
+import struct
+import sys
+import unicodedata
+
+# Binary index layout: a header, followed by a table of all terms sorted, then
+# the postings of all terms. The postings of a term are a sequence of varints:
+# for every document, its ID (delta-encoded to the previous document), its
+# tri-gram frequency, its number of positions, and the positions (zigzag
+# delta-encoded, as they are not always sorted).
+BINARY_MAGIC = b'LFZ1'
+BINARY_HEADER = struct.Struct('<4sI')  # magic, number of terms
+BINARY_TERM = struct.Struct('<3sIII')  # term, offset, size, number of docs
+
+
+class PhoneticIndex:
+    """Lafzi phonetic index
+
+    The index is loaded only once, then kept for the lifetime of the
+    application. The postings of a tri-gram are given as compact arrays: the
+    document IDs, the tri-gram frequencies, and the tri-gram positions of all
+    documents concatenated along with the offset of each document into them.
+    """
+
+    _instance: PhoneticIndex = None
+    _lock = Lock()
+
+    @classmethod
+    def get(cls) -> PhoneticIndex:
+        """Get the application-wide index, loading it if needed
+
+        The binary index generated by the build is preferred. Otherwise, e.g.
+        when running from the source tree, fall back to the text files.
+        """
+        with cls._lock:
+            if not PhoneticIndex._instance:
+                module_dirpath = path.dirname(path.abspath(__file__))
+                index_filepath = path.join(module_dirpath, 'lafzi_index.bin')
+                if path.isfile(index_filepath):
+                    PhoneticIndex._instance = \
+                        BinaryPhoneticIndex(index_filepath)
+                else:
+                    PhoneticIndex._instance = TextPhoneticIndex(
+                        path.join(module_dirpath, 'lafzi_termlist.txt'),
+                        path.join(module_dirpath, 'lafzi_postlist.txt'))
+            return PhoneticIndex._instance
+
+    @classmethod
+    def warm_up(cls) -> None:
+        """Load the application-wide index in the background."""
+        Thread(target=cls.get, daemon=True).start()
+
+    def get_terms(self) -> list:
+        raise NotImplementedError
+
+    def get_postings(
+            self,
+            term: str) -> tuple:
+        """Get the postings of a tri-gram, or None if it is not indexed."""
+        raise NotImplementedError
+
+    def search(
+            self,
+            query: str,
+            thresholds: tuple = (0.9, 0.8, 0.7),
+            limit: int = None) -> list:
+        """Search for the documents matching a phonetic query by relevance
+
+        Every document is scored in a single pass by its number of matched
+        tri-grams. The documents passing the first threshold that gives any
+        result, i.e. a minimum ratio of matched tri-grams to all tri-grams of
+        the query, are then ranked by how well the tri-gram positions follow
+        the query order, as in the original Lafzi algorithm. Returns the
+        `limit` most relevant documents, or all of them if it is not given.
+        """
+        if len(query) < 3:
+            return []
+
+        # create tri-grams from the query, ordered by their first position
+        trigrams = [query[i:i+3] for i in range(len(query) - 2)]
+        query_frequencies = Counter(trigrams)
+        terms = [term for term in query_frequencies
+                 if self.get_postings(term)]
+
+        # count the matched tri-grams of every document
+        matched_counts = {}
+        for term in terms:
+            frequency = query_frequencies[term]
+            document_ids, term_frequencies, _, _ = self.get_postings(term)
+            for idx, document_id in enumerate(document_ids):
+                matched_counts[document_id] = \
+                    matched_counts.get(document_id, 0) \
+                    + min(frequency, term_frequencies[idx])
+
+        # apply the highest threshold that gives any result
+        for threshold in thresholds:
+            min_score = threshold * len(trigrams)
+            candidates = [document_id
+                          for document_id, count in matched_counts.items()
+                          if count >= min_score]
+            if candidates:
+                break
+        else:
+            return []
+
+        matched_docs = []
+        for document_id in candidates:
+            order_score = self.get_order_score(terms, document_id)
+            matched_docs.append({
+                'document-id': document_id,
+                'matched-trigrams-count': matched_counts[document_id],
+                'score': order_score})
+
+        def get_relevance(doc: dict) -> tuple:
+            return (doc['score'], doc['matched-trigrams-count'],
+                    -doc['document-id'])
+
+        if limit is None:
+            return sorted(matched_docs, key=get_relevance, reverse=True)
+        return nlargest(limit, matched_docs, key=get_relevance)
+
+    def get_order_score(
+            self,
+            terms: list,
+            document_id: int) -> float:
+        """Score the order of the query tri-grams in a document
+
+        The score is the length of the longest sequence of tri-gram positions
+        in the document that follows the query order, weighted by how close
+        the positions are to each other.
+        """
+        # Concatenate the positions of each tri-gram in the query order. The
+        # positions of a tri-gram are reversed, so that only one of them can
+        # be in an increasing sequence.
+        sequence = []
+        for term in terms:
+            document_ids, _, offsets, positions = self.get_postings(term)
+            idx = bisect_left(document_ids, document_id)
+            if idx == len(document_ids) \
+                    or document_ids[idx] != document_id:
+                continue
+            sequence.extend(sorted(positions[offsets[idx]:offsets[idx+1]],
+                                   reverse=True))
+        if not sequence:
+            return 0
+
+        # Find the longest strictly increasing subsequence
+        tails = []  # the last position of the subsequences of each length
+        tail_indexes = []
+        parents = [-1] * len(sequence)
+        for idx, position in enumerate(sequence):
+            length = bisect_left(tails, position)
+            if length > 0:
+                parents[idx] = tail_indexes[length-1]
+            if length == len(tails):
+                tails.append(position)
+                tail_indexes.append(idx)
+            else:
+                tails[length] = position
+                tail_indexes[length] = idx
+
+        subsequence = []
+        idx = tail_indexes[-1]
+        while idx >= 0:
+            subsequence.append(sequence[idx])
+            idx = parents[idx]
+        subsequence.reverse()
+
+        # Adjacent tri-grams are one position apart, so a larger average gap
+        # means the tri-grams are scattered across the document
+        if len(subsequence) > 1:
+            average_gap = (subsequence[-1] - subsequence[0]) \
+                / (len(subsequence) - 1)
+            contiguity = 1 / average_gap
+        else:
+            contiguity = 1
+        return len(subsequence) * contiguity
+
+
+class TextPhoneticIndex(PhoneticIndex):
+    """Phonetic index parsed from the text files
+
+    All postings are parsed at once when loading, so that looking them up
+    later is only a dict access.
+    """
+
+    def __init__(
+            self,
+            termlist_filepath: str,
+            postlist_filepath: str) -> None:
+        self.postings = {}
+
+        with open(termlist_filepath, 'r') as termlist_file, \
+             open(postlist_filepath, 'rb') as postlist_file:
+            postlist = postlist_file.read()
+            for line in termlist_file:
+                term, offset = line.split('|')
+                offset = int(offset)
+                end = postlist.find(b'\n', offset)
+                if end < 0:
+                    end = len(postlist)
+                self.postings[term] = \
+                    self.decode_postings(postlist[offset:end].decode())
+
+    @staticmethod
+    def decode_postings(line: str) -> tuple:
+        document_ids = array('H')
+        frequencies = array('H')
+        offsets = array('I', [0])
+        positions = array('H')
+        for posting in line.split(';'):
+            document_id, frequency, term_positions = posting.split(':')
+            document_ids.append(int(document_id))
+            frequencies.append(int(frequency))
+            positions.extend(map(int, term_positions.split(',')))
+            offsets.append(len(positions))
+        return document_ids, frequencies, offsets, positions
+
+    def get_terms(self) -> list:
+        return sorted(self.postings)
+
+    def get_postings(
+            self,
+            term: str) -> tuple:
+        return self.postings.get(term)
+
+
+class BinaryPhoneticIndex(PhoneticIndex):
+    """Phonetic index memory-mapped from the binary file
+
+    Only the term table is read when loading. The postings of a tri-gram are
+    decoded straight from the memory map the first time they are needed, and
+    then kept.
+    """
+
+    def __init__(
+            self,
+            index_filepath: str) -> None:
+        with open(index_filepath, 'rb') as index_file:
+            self.buffer = mmap(index_file.fileno(), 0, access=ACCESS_READ)
+
+        magic, n_terms = BINARY_HEADER.unpack_from(self.buffer)
+        if magic != BINARY_MAGIC:
+            raise ValueError(f'{index_filepath} is not a Lafzi binary index')
+
+        self.terms = {}
+        self.postings = {}
+        table_start = BINARY_HEADER.size
+        table_end = table_start + n_terms*BINARY_TERM.size
+        for term, offset, size, n_docs in BINARY_TERM.iter_unpack(
+                memoryview(self.buffer)[table_start:table_end]):
+            self.terms[term.decode()] = (table_end + offset, size, n_docs)
+
+    def get_terms(self) -> list:
+        return sorted(self.terms)
+
+    def get_postings(
+            self,
+            term: str) -> tuple:
+        if term in self.postings:
+            return self.postings[term]
+        if term not in self.terms:
+            return None
+
+        start, size, n_docs = self.terms[term]
+        values = decode_varints(self.buffer, start, start + size)
+
+        document_ids = array('H')
+        frequencies = array('H')
+        offsets = array('I', [0])
+        positions = array('H')
+        document_id = 0
+        for _ in range(n_docs):
+            document_id += next(values)
+            document_ids.append(document_id)
+            frequencies.append(next(values))
+            position = 0
+            for _ in range(next(values)):
+                delta = next(values)
+                position += (delta >> 1) ^ -(delta & 1)
+                positions.append(position)
+            offsets.append(len(positions))
+
+        postings = (document_ids, frequencies, offsets, positions)
+        self.postings[term] = postings
+        return postings
+
+
+def _replace_by_table(replacements: dict):
+    """Make a rule replacing all given substrings in a single pass."""
+    pattern = re.compile('|'.join(
+        re.escape(old) for old in sorted(replacements, key=len, reverse=True)))
+    return lambda text: pattern.sub(
+        lambda match: replacements[match.group()], text)
+
+
+def _replace_by_regex(
+        pattern: str,
+        replacement):
+    pattern = re.compile(pattern)
+    return lambda text: pattern.sub(replacement, text)
+
+
+def _replace_in_order(replacements: list):
+    def replace(text: str) -> str:
+        for old, new in replacements:
+            text = text.replace(old, new)
+        return text
+    return replace
+
+
+# The transliteration rules, applied in order. Rules which cannot interfere
+# with each other are merged to be applied in a single pass, but most of them
+# depend on the result of the previous ones, so a text still takes a dozen
+# passes, about as long as the former implementation took. It is the cache of
+# `latin2phonetic()` which saves transliterating the same query again.
+LATIN2PHONETIC_RULES = (
+    # Normalise the latin text: make all characters capitalized, replace strips
+    # with spaces, and remove non-alphabetic characters except ampersands and
+    # spaces
+    lambda text: text.upper().replace('-', ' '),
+    _replace_by_regex(r"[^A-Z'`\&\s]", ''),
+
+    # remove repeated adjacent characters
+    _replace_by_regex(r'(?s)(.)\1+', r'\1'),
+
+    # remove duplicate adjacent two-letter-consonants
+    _replace_by_regex(r'(KH|CH|SH|TS|SY|DH|TH|ZH|DH|DZ|GH)+', r'\1'),
+
+    # replace the letters O and E since they are not in arabic
+    lambda text, table=str.maketrans('OE', 'AI'): text.translate(table),
+
+    # replace the diphthong from non-Arabic to Arabic
+    _replace_by_table({'AI': 'AY', 'AU': 'AW'}),
+
+    # mark the hamzas: the leading vowels, the vowels after spaces, and the
+    # vowels after another vowel
+    _replace_by_regex(r'^(A|I|U)+|( (?=A|I|U)|I(?=A|U)|U(?=A|I))',
+                      lambda match: 'X' + match.group(1) if match.group(1)
+                      else match.group(2) + 'X'),
+
+    # replace the ikhfas (NG) and the iqlabs
+    _replace_by_regex(r'(A|I|U)NG\s?(D|F|J|K|P|Q|S|T|V|Z)+|N\s?B',
+                      lambda match: match.group(1) + 'N' + match.group(2)
+                      if match.group(1) else 'MB'),
+
+    # replace the idghams, except for some words
+    _replace_by_table({'DUNYA': 'DUN_YA', 'BUNYAN': 'BUN_YAN',
+                       'QINWAN': 'KIN_WAN', 'KINWAN': 'KIN_WAN',
+                       'SINWAN': 'SIN_WAN', 'SHINWAN': 'SIN_WAN'}),
+    _replace_by_regex(r'N\s?(N|M|L|R|Y|W)+', r'\1'),
+    # BUNYAN is deliberately left as BUN_YAN, giving the very codes of the
+    # former implementation, which looked for BUN-YAN instead (see the
+    # `bunyan` row of build-aux/benchmarks/latin2phonetic.tsv). Its tri-grams
+    # across the underscore are then not in the index, but the others still
+    # match BUNYAN there.
+    _replace_by_table({'DUN_YA': 'DUNYA', 'KIN_WAN': 'KINWAN',
+                       'SIN_WAN': 'SINWAN'}),
+
+    # replace two-letter-consonants; these must stay in order, since the
+    # result of one may make up another (e.g. CKH to CH to H), which is also
+    # why GH is replaced twice (e.g. GHKH to GHH to GH to G)
+    _replace_in_order([('KH', 'H'), ('CH', 'H'), ('SH', 'S'), ('TS', 'S'),
+                       ('SY', 'S'), ('DH', 'D'), ('ZH', 'Z'), ('DZ', 'Z'),
+                       ('TH', 'T'), ('NGA', 'XNGA'), ('NGI', 'XNGI'),
+                       ('NGU', 'XNGU'), ('GH', 'G'), ('GH', 'G')]),
+
+    # replace one-letter-consonants and remove spaces
+    lambda text, table=str.maketrans("'`QVPJ", 'XXKFFZ', ' '):
+        text.translate(table),
+)
+
+
+@lru_cache(maxsize=256)
+def latin2phonetic(latin_text: str) -> str:
+    """Transliterate a latin text into the Lafzi phonetic code
+
+    Results are cached, since the query is transliterated again on every
+    keystroke.
+    """
+    for rule in LATIN2PHONETIC_RULES:
+        latin_text = rule(latin_text)
+    return latin_text
+
+
+# The codes of the Arabic consonants, the same ones `latin2phonetic()` ends up
+# with. The ta marbuta is read as H when stopping on it (see below).
+ARABIC_CONSONANTS = {
+    'ء': 'X', 'أ': 'X', 'إ': 'X', 'ؤ': 'X', 'ئ': 'X', 'ع': 'X', 'ب': 'B',
+    'ت': 'T', 'ة': 'T', 'ث': 'S', 'ج': 'Z', 'ح': 'H', 'خ': 'H', 'د': 'D',
+    'ذ': 'Z', 'ر': 'R', 'ز': 'Z', 'س': 'S', 'ش': 'S', 'ص': 'S', 'ض': 'D',
+    'ط': 'T', 'ظ': 'Z', 'غ': 'G', 'ف': 'F', 'ق': 'K', 'ك': 'K', 'ل': 'L',
+    'م': 'M', 'ن': 'N', 'ه': 'H', 'و': 'W', 'ي': 'Y', 'ی': 'Y',
+}
+
+# The short vowels and the tanwins, in lowercase until the stop at the end of
+# the ayah is applied, so that they are told apart from the long vowels
+ARABIC_VOWELS = {
+    'َ': 'a', 'ِ': 'i', 'ُ': 'u',
+    'ً': 'an', 'ٍ': 'in', 'ٌ': 'un',
+    'ࣰ': 'an', 'ࣲ': 'in', 'ࣱ': 'un',
+}
+
+ARABIC_ALEFS = 'اٱى'
+ARABIC_SHADDA = 'ّ'
+ARABIC_SUPERSCRIPT_ALEF = 'ٰ'
+ARABIC_SILENT_MARK = '۟'
+ARABIC_MADDAH = '\u0653'
+ARABIC_MARKS = \
+    set(ARABIC_VOWELS) | {ARABIC_SHADDA, ARABIC_SUPERSCRIPT_ALEF,
+                          ARABIC_SILENT_MARK, 'ْ', 'ۡ'}
+
+# The disjoined letters opening some surahs, read by their names
+ARABIC_MUQATTAAT = {
+    'الم': 'XALIFLAMIM', 'المص': 'XALIFLAMIMSAD', 'الر': 'XALIFLAMRA',
+    'المر': 'XALIFLAMIMRA', 'كهيعص': 'KAFHAYAXAYNSAD', 'طه': 'TAHA',
+    'طسم': 'TASIMIM', 'طس': 'TASIN', 'يس': 'YASIN', 'ص': 'SAD',
+    'حم': 'HAMIM', 'عسق': 'XAYNSINKAF', 'ق': 'KAF', 'ن': 'NUN',
+}
+
+# The rules applied on the whole ayah once its letters are encoded, i.e. the
+# idghams and the iqlabs across the words, as done by `latin2phonetic()`.
+# The disjoined letters are separated by a bar, so that these don't apply
+# across them.
+ARABIC2PHONETIC_RULES = (
+    _replace_by_regex(r'N\s?B', 'MB'),
+    _replace_by_table({'DUNYA': 'DUN_YA', 'BUNYAN': 'BUN_YAN',
+                       'KINWAN': 'KIN_WAN', 'SINWAN': 'SIN_WAN'}),
+    _replace_by_regex(r'N\s?(N|M|L|R|Y|W)+', r'\1'),
+    lambda text, table=str.maketrans('', '', ' |_'): text.translate(table),
+    _replace_by_regex(r'(.)\1+', r'\1'),
+)
+
+
+def _split_letters(word: str) -> list:
+    letters = []
+    for char in word:
+        if char in ARABIC_MARKS:
+            if letters:
+                letters[-1][1].append(char)
+        elif char in ARABIC_CONSONANTS or char in ARABIC_ALEFS or char == 'آ':
+            letters.append((char, []))
+    return letters
+
+
+def arabic2phonetic(arabic_text: str) -> str:
+    """Transliterate a vowelled ayah into the Lafzi phonetic code
+
+    The ayah is read the way a query typed in latin is transliterated by
+    `latin2phonetic()`: the silent letters are dropped, the long vowels are
+    kept as their short ones, and the reader stops on the last word.
+    """
+    # The maddah above a letter only marks a prolonged vowel in the Uthmani
+    # script, whereas the alef with a maddah of the simple script, e.g. in
+    # الْقُرْآنِ, is a hamza and a long vowel. So the mark is dropped first, as
+    # normalizing would compose it with an alef into the latter.
+    arabic_text = arabic_text.replace(ARABIC_MADDAH, '')
+    arabic_text = unicodedata.normalize('NFC', arabic_text)
+    arabic_text = re.sub('ـ([ً-ْ]*)ٔ', 'ء\\1',
+                         arabic_text)
+    arabic_text = arabic_text.replace('ـ', '')
+
+    # The pause marks between the words are not read
+    codes = []
+    words = [letters for letters in map(_split_letters, arabic_text.split())
+             if letters]
+    if words and not any(marks for _, marks in words[0]):
+        muqattaat = ARABIC_MUQATTAAT.get(
+            ''.join(letter for letter, _ in words[0]))
+        if muqattaat:
+            codes.append(muqattaat + '|')
+            words = words[1:]
+
+    for letters in words:
+        for idx, (letter, marks) in enumerate(letters):
+            if ARABIC_SILENT_MARK in marks:
+                continue
+            vowel = next((ARABIC_VOWELS[mark] for mark in marks
+                          if mark in ARABIC_VOWELS), '')
+            long_vowel = 'A' if ARABIC_SUPERSCRIPT_ALEF in marks else ''
+            previous = codes[-1][-1:] if codes else ''
+
+            if letter == 'آ':
+                codes.append('XA')
+            elif letter in ARABIC_ALEFS and not vowel:
+                # The alef opening the ayah is read, the others lengthen the
+                # fatha before them, or are not read at all
+                if not codes:
+                    codes.append('XA')
+                elif previous in 'aA' or long_vowel:
+                    codes.append('A')
+            elif letter in 'وي' and not vowel \
+                    and ARABIC_SHADDA not in marks:
+                # Weak letters are the long vowels after their own short
+                # vowel, or the seats of a superscript alef
+                if long_vowel:
+                    codes.append('A')
+                elif previous == ('u' if letter == 'و' else 'i'):
+                    codes.append('U' if letter == 'و' else 'I')
+                else:
+                    codes.append(ARABIC_CONSONANTS[letter])
+            elif letter == 'ل' and not marks and idx + 1 < len(letters) \
+                    and ARABIC_SHADDA in letters[idx+1][1]:
+                # The lam of the article merges into the sun letters
+                continue
+            else:
+                codes.append(ARABIC_CONSONANTS.get(letter, 'X') + vowel +
+                             long_vowel)
+        codes.append(' ')
+
+    # Stop on the last word: drop its vowel, or its tanwin reading the
+    # fathatan as a long fatha, and read the ta marbuta as H
+    text = ''.join(codes).rstrip()
+    text = re.sub('[iu]?n$|[aiu]$', '', text)
+    if words and words[-1][-1][0] == 'ة':
+        text = text[:-1] + 'H'
+
+    text = text.upper()
+    for rule in ARABIC2PHONETIC_RULES:
+        text = rule(text)
+    return text
+
+
+def decode_varints(
+        buffer: mmap,
+        start: int,
+        end: int):
+    """Decode unsigned LEB128 varints from a buffer."""
+    value = 0
+    shift = 0
+    for byte in memoryview(buffer)[start:end]:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = 0
+            shift = 0
+
+
+def encode_varints(
+        values: list,
+        output: bytearray) -> None:
+    """Encode unsigned LEB128 varints into a buffer."""
+    for value in values:
+        while value > 0x7f:
+            output.append(value & 0x7f | 0x80)
+            value >>= 7
+        output.append(value)
+
+
+def compile_index(
+        phonetic_index: PhoneticIndex,
+        index_filepath: str) -> None:
+    """Write a phonetic index into the binary format."""
+    table = bytearray()
+    postings = bytearray()
+    terms = phonetic_index.get_terms()
+    for term in terms:
+        document_ids, frequencies, offsets, positions = \
+            phonetic_index.get_postings(term)
+
+        values = []
+        previous_document_id = 0
+        for idx, document_id in enumerate(document_ids):
+            values.append(document_id - previous_document_id)
+            values.append(frequencies[idx])
+            values.append(offsets[idx+1] - offsets[idx])
+            previous_position = 0
+            for position in positions[offsets[idx]:offsets[idx+1]]:
+                delta = position - previous_position
+                values.append((delta << 1) ^ (delta >> 63))
+                previous_position = position
+            previous_document_id = document_id
+
+        offset = len(postings)
+        encode_varints(values, postings)
+        table += BINARY_TERM.pack(term.encode(), offset,
+                                  len(postings) - offset, len(document_ids))
+
+    with open(index_filepath, 'wb') as index_file:
+        index_file.write(BINARY_HEADER.pack(BINARY_MAGIC, len(terms)))
+        index_file.write(table)
+        index_file.write(postings)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        sys.exit(f'usage: {sys.argv[0]} TERMLIST POSTLIST OUTPUT')
+    compile_index(TextPhoneticIndex(sys.argv[1], sys.argv[2]), sys.argv[3])
@@ -30,22 +30,39 @@ gi.require_version('Pango', '1.0')
 
 from gi.repository import Gdk
 from gi.repository import Gio
+from gi.repository import GLib
 from gi.repository import GObject
 from gi.repository import Gtk
 from os import path
 
 from . import constants as const
 from . import globals as glob
+from .lafzi import PhoneticIndex
+from .model import Connection
 from .model import Musshaf
 from .musshaf import MusshafDialog
+from .page import PageCache
+from .page import PagePrefetcher
+from .page import PagePyramid
+from .search import SearchCache
 from .window import MainWindow
 
 class Application(Gtk.Application):
 
+    is_printing_stats: bool = False
+    search_stats: list = None  # of the search popovers of the main windows
+                               # which have been closed
+
     def __init__(self) -> None:
         super().__init__(application_id=const.APPLICATION_ID,
                          flags=Gio.ApplicationFlags.FLAGS_NONE)
 
+        self.search_stats = []
+
+        self.add_main_option('print-stats', 0, GLib.OptionFlags.NONE,
+                             GLib.OptionArg.NONE,
+                             'Print the cache statistics on exit', None)
+
         # Load the saved user settings
         self.settings = Gio.Settings.new(const.APPLICATION_ID)
         glob.musshaf_name = self.settings.get_string('musshaf-name')
@@ -63,6 +80,12 @@ class Application(Gtk.Application):
         glob.surah_number = self.settings.get_int('surah-number')
         glob.ayah_number = self.settings.get_int('ayah-number')
 
+        PageCache.max_bytes = \
+            self.settings.get_int('page-cache-size') * 1024 * 1024
+        PagePrefetcher.depth = self.settings.get_int('page-prefetch-depth')
+        PagePyramid.max_bytes = \
+            self.settings.get_int('page-pyramid-size') * 1024 * 1024
+
         # Watch the system-wide settings when global Gtk application theme has
         # been changed
         Gtk.Settings.get_default().connect('notify::gtk-theme-name',
@@ -72,10 +95,21 @@ class Application(Gtk.Application):
         # application theme
         self.reload_css()
 
+    def do_handle_local_options(
+            self,
+            options: GLib.VariantDict) -> int:
+        self.is_printing_stats = options.contains('print-stats')
+        return -1  # continue the default processing
+
     def do_activate(self) -> None:
         window = self.props.active_window
 
         if not window:
+            self.migrate_musshafs()
+
+            # Load the phonetic search index before the user needs it
+            PhoneticIndex.warm_up()
+
             # If the application has ever been opened, open the main window.
             # Otherwise, open the musshaf manager dialog.
             musshaf_filepath = path.join(
@@ -84,12 +118,22 @@ class Application(Gtk.Application):
             with Musshaf() as musshaf:
                 if musshaf.is_musshaf_exist(glob.musshaf_name) \
                         and path.isfile(musshaf_filepath):
-                    window = MainWindow(application=self)
+                    window = self.create_main_window()
                 else:
                     window = MusshafDialog(application=self)
 
         window.present()
 
+    def migrate_musshafs(self) -> None:
+        """Index the Musshafs downloaded by the previous versions."""
+        with Musshaf() as musshaf:
+            for musshaf_name in musshaf.get_musshaf_names():
+                if musshaf.is_musshaf_indexed(musshaf_name):
+                    continue
+                print(f'The Musshaf ID `{musshaf_name}` has no indexes on its '
+                      'bounding boxes. Creating them...')
+                musshaf.create_indexes(musshaf_name)
+
     def switch_to(
             self,
             window_name: str,
@@ -100,10 +144,22 @@ class Application(Gtk.Application):
         if window_name == 'musshaf_dialog':
             window = MusshafDialog(application=self)
         else:
-            window = MainWindow(application=self)
+            window = self.create_main_window()
 
         window.present()
 
+    def create_main_window(self) -> MainWindow:
+        window = MainWindow(application=self)
+        window.connect('destroy', self.on_main_window_destroyed)
+        return window
+
+    def on_main_window_destroyed(
+            self,
+            window: MainWindow) -> None:
+        # Only keep the stats, rather than the window itself
+        self.search_stats.append(
+            window.headerbar.popover_search.get_stats())
+
     def reload_css(self) -> None:
         """Reload styles based on the global Gtk application theme variants
 
@@ -151,6 +207,20 @@ class Application(Gtk.Application):
             self.settings.set_int('surah-number', glob.surah_number)
             self.settings.set_int('ayah-number', glob.ayah_number)
 
+    def print_stats(self) -> None:
+        """Print how well the caches have been doing, for debugging."""
+        print(f'Database connections: {Connection.get_stats()}')
+        print(f'Search results cache: {SearchCache.get_stats()}')
+        print(f'Decoded page cache: {PageCache.get_stats()}')
+        print(f'Page prefetcher: {PagePrefetcher.get_stats()}')
+        print(f'Page pyramid: {PagePyramid.get_stats()}')
+        search_stats = self.search_stats \
+            + [window.headerbar.popover_search.get_stats()
+               for window in self.get_windows()
+               if isinstance(window, MainWindow)]
+        for stats in search_stats:
+            print(f'Search popover: {stats}')
+
     def on_theme_changed(
             self,
             settings: Gtk.Settings,
@@ -167,4 +237,6 @@ def main(
     application = Application()
     exit_status = application.run(sys.argv)
     application.save_user_settings()
+    if application.is_printing_stats:
+        application.print_stats()
     return exit_status
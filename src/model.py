@@ -17,8 +17,19 @@
 
 from __future__ import annotations
 from abc import ABC
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from os import makedirs
 from os import path
+from os import replace
+from os import stat
+from threading import Lock
+from threading import local
+from typing import Callable
+from typing import NamedTuple
 from typing import Union
+import pickle
 import re
 import sqlite3
 
@@ -26,6 +37,101 @@ from . import constants as const
 from . import globals as glob
 
 
+class Connection:
+    """Long-lived SQLite connections shared by all models
+
+    Opening a connection (and registering the Python functions on it) is
+    relatively expensive compared to the queries the models usually run, e.g.
+    on every page turn. So, a connection is opened only once per database file
+    and per thread, and then reused by any model entering the same database.
+    Connections belong to a thread, so the ones opened by download threads are
+    closed together with their thread.
+    """
+
+    _local = local()
+    _lock = Lock()
+
+    # Statistics for confirming that connections are actually reused
+    n_opened: int = 0
+    n_reused: int = 0
+    n_regexp_evaluated: int = 0  # as reported by `count_regexp()`
+
+    @classmethod
+    def open(
+            cls,
+            filepath: str) -> sqlite3.Connection:
+        connections = cls._local.__dict__.setdefault('connections', {})
+
+        connection = connections.get(filepath)
+        if connection:
+            with cls._lock:
+                cls.n_reused += 1
+            return connection
+
+        connection = sqlite3.connect(filepath)
+        connection.create_function('REGEXP', 2, cls.regexp,
+                                   deterministic=True)
+
+        connections[filepath] = connection
+        with cls._lock:
+            cls.n_opened += 1
+
+        return connection
+
+    @classmethod
+    def close(
+            cls,
+            filepath: str = None) -> None:
+        """Close the connection(s) owned by the current thread."""
+        connections = cls._local.__dict__.get('connections', {})
+        for key in list(connections):
+            if filepath is None \
+                    or key == filepath:
+                connections.pop(key).close()
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def compile_regexp(expr: str) -> re.Pattern:
+        return re.compile(expr)
+
+    @classmethod
+    def regexp(
+            cls,
+            expr: str,
+            item: str) -> bool:
+        """Implement `item REGEXP expr`, with the flags given inline, e.g.
+        `(?i)` for case-insensitive matching
+
+        It is called for every row, so the expression is compiled only once.
+        """
+        cls._local.n_regexp_evaluated = \
+            cls._local.__dict__.get('n_regexp_evaluated', 0) + 1
+        if item is None:
+            return False
+        return cls.compile_regexp(expr).search(item) is not None
+
+    @classmethod
+    def count_regexp(
+            cls,
+            since: int = 0,
+            is_final: bool = False) -> int:
+        """Count the REGEXP evaluations of the current thread since a previous
+        count, e.g. before a query. The final count of a query is added to the
+        statistics."""
+        n_regexp_evaluated = \
+            cls._local.__dict__.get('n_regexp_evaluated', 0) - since
+        if is_final:
+            with cls._lock:
+                cls.n_regexp_evaluated += n_regexp_evaluated
+        return n_regexp_evaluated
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            return {'opened': cls.n_opened, 'reused': cls.n_reused,
+                    'regexp': cls.n_regexp_evaluated}
+
+
 class Model(ABC):
 
     _database_filepath = None
@@ -41,15 +147,8 @@ class Model(ABC):
         self._database_filepath = filepath
 
     def __enter__(self) -> Model:
-        self.connection = sqlite3.connect(self._database_filepath)
+        self.connection = Connection.open(self._database_filepath)
         self.cursor = self.connection.cursor()
-
-        def regexp(
-                expr: str,
-                item: str) -> bool:
-            return re.search(expr, item) is not None
-        self.connection.create_function('REGEXP', 2, regexp)
-
         return self
 
     def __exit__(
@@ -57,7 +156,165 @@ class Model(ABC):
             type,
             value,
             traceback) -> None:
-        self.connection.close()
+        # The connection is kept open for the next use, so make sure nothing
+        # left by a failed operation is carried over
+        if type is not None \
+                and self.connection.in_transaction:
+            self.connection.rollback()
+        self.cursor.close()
+
+    def fetch(
+            self,
+            query: str,
+            parameters: tuple = (),
+            is_interrupted: Callable = None) -> list:
+        """Fetch the rows of a query, or only the rows fetched so far as soon
+        as `is_interrupted()` returns True, which is checked periodically
+
+        A query which cannot be run at all has no row.
+        """
+        rows = []
+        if is_interrupted:
+            self.connection.set_progress_handler(is_interrupted, 1000)
+        try:
+            for row in self.cursor.execute(query, parameters):
+                rows.append(row)
+        except sqlite3.OperationalError:  # e.g. it has been interrupted
+            pass
+        finally:
+            if is_interrupted:
+                self.connection.set_progress_handler(None, 1000)
+        return rows
+
+
+class Surah(NamedTuple):
+    """A row of the `suras` table"""
+    id: int
+    ayas: int
+    start: int
+    name: str
+    tname: str
+    aname: str
+    ename: str
+    type: str
+    order: int
+    rukus: int
+
+
+class SurahCatalogue:
+    """All surahs, loaded once from the `suras` table
+
+    The table never changes, so it is read only once and kept as an immutable
+    tuple indexed by surah number, i.e. `surahs[surah_no-1]`.
+    """
+
+    _catalogue: SurahCatalogue = None
+    _lock = Lock()
+
+    def __init__(
+            self,
+            cursor: sqlite3.Cursor) -> None:
+        cursor.execute('SELECT * FROM suras ORDER BY id')
+        self.surahs = tuple(Surah(*surah) for surah in cursor.fetchall())
+
+    @classmethod
+    def get(
+            cls,
+            cursor: sqlite3.Cursor) -> SurahCatalogue:
+        with cls._lock:
+            if cls._catalogue is None:
+                cls._catalogue = cls(cursor)
+            return cls._catalogue
+
+    def get_surah(
+            self,
+            surah_no: int) -> Surah:
+        if 1 <= surah_no <= len(self.surahs):
+            return self.surahs[surah_no-1]
+        return None
+
+
+class Boundary:
+    """Start boundaries of a Quran division, i.e. juzs, hizb quarters, manzils
+    or rukus
+
+    The boundaries are loaded once as sorted global ayah numbers, i.e. the
+    zero-based positions of the ayahs in the whole Quran, so that finding the
+    division containing an ayah is a binary search rather than letting SQLite
+    sort the whole table on every call.
+    """
+
+    _boundaries: dict = {}  # by table name
+    _lock = Lock()
+
+    def __init__(
+            self,
+            table: str,
+            cursor: sqlite3.Cursor) -> None:
+        surahs = SurahCatalogue.get(cursor).surahs
+        self.surah_lengths = array('h', [surah.ayas for surah in surahs])
+        self.surah_starts = array('h', [surah.start for surah in surahs])
+        self.n_ayahs = self.surah_starts[-1] + self.surah_lengths[-1]
+
+        cursor.execute(f'SELECT sura, aya FROM {table} ORDER BY id')
+        self.starts = array('h', [self.get_offset(*suraya)
+                                  for suraya in cursor.fetchall()])
+
+    @classmethod
+    def get(
+            cls,
+            table: str,
+            cursor: sqlite3.Cursor) -> Boundary:
+        with cls._lock:
+            if table not in cls._boundaries:
+                cls._boundaries[table] = cls(table, cursor)
+            return cls._boundaries[table]
+
+    def get_offset(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        """Get the global ayah number of a surah-ayah pair. Out of range ayah
+        numbers are clamped to their surah, and out of range surah numbers to
+        the whole Quran."""
+        if surah_no < 1:
+            return -1
+        if surah_no > len(self.surah_starts):
+            return self.n_ayahs - 1
+        ayah_no = max(0, min(ayah_no, self.surah_lengths[surah_no-1]))
+        return self.surah_starts[surah_no-1] + ayah_no - 1
+
+    def get_division_no(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        division_no = bisect_right(self.starts,
+                                   self.get_offset(surah_no, ayah_no))
+        if division_no:
+            return division_no
+        return -1
+
+    def get_division_nos(
+            self,
+            surayas: list) -> list:
+        """Get the division numbers of a list of surah-ayah pairs at once, e.g.
+        of all bounding boxes on a page."""
+        division_nos = []
+        division_no = 0
+        previous_offset = -1
+        for suraya in surayas:
+            offset = self.get_offset(*suraya[:2])
+            # Most lists are sorted, so keep searching forward from the last
+            # division found and only bisect again when going backward
+            if offset < previous_offset:
+                division_no = bisect_right(self.starts, offset)
+            else:
+                while division_no < len(self.starts) \
+                        and self.starts[division_no] <= offset:
+                    division_no += 1
+            previous_offset = offset
+            division_nos.append(division_no if division_no else -1)
+        return division_nos
 
 
 class Metadata(Model):
@@ -75,17 +332,15 @@ class Metadata(Model):
                             (glob.musshaf_name,))
         return self.cursor.fetchone()
 
-    def get_surahs(self) -> list:
-        self.cursor.execute('SELECT * FROM suras')
-        return self.cursor.fetchall()
+    def get_surahs(self) -> tuple:
+        return SurahCatalogue.get(self.cursor).surahs
 
     def get_surah_length(
             self,
             surah_no: int) -> int:
-        self.cursor.execute('SELECT ayas FROM suras WHERE id=?', (surah_no,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
+        surah = SurahCatalogue.get(self.cursor).get_surah(surah_no)
+        if surah:
+            return surah.ayas
         return -1
 
     def get_surah_no(
@@ -113,11 +368,9 @@ class Metadata(Model):
     def get_surah_name(
             self,
             surah_no: int) -> int:
-        query = f'SELECT tname FROM suras WHERE id=?'
-        self.cursor.execute(query, (surah_no,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
+        surah = SurahCatalogue.get(self.cursor).get_surah(surah_no)
+        if surah:
+            return surah.tname
         return -1
 
     def get_ayah_no(
@@ -142,10 +395,10 @@ class Metadata(Model):
 
     def get_ayah_texts(
             self,
-            query: str) -> list:
-        self.cursor.execute('SELECT sura, aya, text FROM texts WHERE text LIKE'
-                            ' ?', ('%'+query+'%',))
-        return self.cursor.fetchall()
+            query: str,
+            case_sensitive: bool = False) -> list:
+        """Get the ayahs containing a substring, see `TrigramIndex`."""
+        return TrigramIndex.get('texts').search(query, case_sensitive)
 
     def get_ayah_text(
             self,
@@ -165,53 +418,47 @@ class Metadata(Model):
                 return result[0]
             return -1
 
+    def get_ayah_texts_by_ids(
+            self,
+            text_ids: list) -> list:
+        """Get the surah number, ayah number and text of many ayahs at once,
+        in the order of the given IDs."""
+        texts = {}
+        for start in range(0, len(text_ids), 500):
+            chunk = text_ids[start:start+500]
+            self.cursor.execute('SELECT id, sura, aya, text FROM texts WHERE id'
+                                f' IN ({",".join("?" * len(chunk))})', chunk)
+            for text in self.cursor.fetchall():
+                texts[text[0]] = text[1:]
+        return [texts[text_id] for text_id in text_ids if text_id in texts]
+
     def get_juz_no(
             self,
             surah_no: int,
             ayah_no: int) -> int:
-        self.cursor.execute('SELECT id FROM juzs WHERE (sura=? AND aya<=?) OR '
-                            'sura<? ORDER BY id DESC',
-                            (surah_no, ayah_no, surah_no))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        return -1
+        return Boundary.get('juzs', self.cursor).get_division_no(
+            surah_no, ayah_no)
 
     def get_hizb_no(
             self,
             surah_no: int,
             ayah_no: int) -> int:
-        self.cursor.execute('SELECT id FROM hizbs WHERE (sura=? AND aya<=?) OR'
-                            ' sura<? ORDER BY id DESC',
-                            (surah_no, ayah_no, surah_no))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        return -1
+        return Boundary.get('hizbs', self.cursor).get_division_no(
+            surah_no, ayah_no)
 
     def get_manzil_no(
             self,
             surah_no: int,
             ayah_no: int) -> int:
-        self.cursor.execute('SELECT id FROM manzils WHERE (sura=? AND aya<=?) '
-                            'OR sura<? ORDER BY id DESC',
-                            (surah_no, ayah_no, surah_no))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        return -1
+        return Boundary.get('manzils', self.cursor).get_division_no(
+            surah_no, ayah_no)
 
     def get_ruku_no(
             self,
             surah_no: int,
             ayah_no: int) -> int:
-        self.cursor.execute('SELECT id FROM rukus WHERE (sura=? AND aya<=?) OR'
-                            ' sura<? ORDER BY id DESC',
-                            (surah_no, ayah_no, surah_no))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        return -1
+        return Boundary.get('rukus', self.cursor).get_division_no(
+            surah_no, ayah_no)
 
     def get_tarajems(self) -> list:
         self.cursor.execute('SELECT * FROM tarajem ORDER BY language')
@@ -253,6 +500,37 @@ class Musshaf(Model):
             return True
         return False
 
+    def get_musshaf_names(self) -> list:
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'"
+                            " AND name NOT LIKE 'sqlite_%'")
+        return [result[0] for result in self.cursor.fetchall()]
+
+    def is_musshaf_indexed(
+            self,
+            musshaf_name: str) -> bool:
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='index' "
+                            'AND tbl_name=?', (musshaf_name,))
+        index_names = {result[0] for result in self.cursor.fetchall()}
+        return {f'{musshaf_name}_page', f'{musshaf_name}_suraya'} \
+            <= index_names
+
+    def create_indexes(
+            self,
+            musshaf_name: str) -> None:
+        """Index the bounding boxes of a Musshaf
+
+        Bounding boxes are looked up by page (for drawing) and by surah-ayah
+        (for navigating), so both must be indexed to avoid scanning the whole
+        table on every page turn.
+        """
+        self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {musshaf_name}_page '
+                            f'ON {musshaf_name} (page)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS '
+                            f'{musshaf_name}_suraya ON {musshaf_name} '
+                            '(sura, aya, id)')
+        self.cursor.execute(f'ANALYZE {musshaf_name}')
+        self.connection.commit()
+
     def get_page_no(
             self,
             surah_no: int,
@@ -314,17 +592,24 @@ class Musshaf(Model):
 
     def get_bboxes(
             self,
-            page_no: int) -> list:
-        if not self.is_musshaf_exist(glob.musshaf_name):
+            page_no: int,
+            musshaf_name: str = None) -> list:
+        # The pages may be rendered in the background for a given Musshaf,
+        # regardless of the one selected meanwhile
+        if musshaf_name is None:
+            musshaf_name = glob.musshaf_name
+        if not self.is_musshaf_exist(musshaf_name):
             return -1
         query = 'SELECT sura, aya, x1, y1, x2-x1, y2-y1 FROM ' \
-            f'{glob.musshaf_name} WHERE page=?'
+            f'{musshaf_name} WHERE page=?'
         self.cursor.execute(query, (page_no,))
         return self.cursor.fetchall()
 
 
 class Tarajem(Model):
 
+    n_regexp_evaluated: int = 0  # by the last search
+
     def __init__(self) -> None:
         self.database_filepath = path.join(const.USER_DATA_PATH, 'tarajem.db')
 
@@ -342,21 +627,70 @@ class Tarajem(Model):
             tarajem_name: str,
             search_query: str,
             case_sensitive: bool = False,
-            match_whole_word: bool = False) -> list:
-        if self.is_tarajem_exist(tarajem_name):
-            if case_sensitive:
-                self.cursor.execute('PRAGMA case_sensitive_like = true;')
-            else:
-                search_query = search_query.lower()
-            query = f'SELECT sura, aya, text FROM {tarajem_name} '
-            if match_whole_word:
-                query = query + 'WHERE text REGEXP ?'
-                self.cursor.execute(query, (r'\b'+search_query+r'\b',))
+            match_whole_word: bool = False,
+            with_rank: bool = False,
+            is_interrupted: Callable = None) -> list:
+        """Search a tarajem by scanning its table, or through its full-text
+        index for the whole words
+
+        The full-text index matches the same words, but regardless of the
+        punctuation and the diacritics in between, so it only prefilters the
+        rows for REGEXP. The table is scanned if the tarajem has no index
+        yet, in which case the results are not ordered by relevance and
+        their rank, if any, is infinite, i.e. they come after any ranked
+        one. Only the texts matched so far are returned as soon as
+        `is_interrupted()` returns True, see `Model.fetch()`.
+        """
+        if not self.is_tarajem_exist(tarajem_name):
+            return []
+
+        expr = r'\b' + re.escape(search_query) + r'\b'
+        if not case_sensitive:
+            expr = '(?i)' + expr
+
+        if match_whole_word:
+            with SearchIndex() as index:
+                if index.is_index_exist(tarajem_name):
+                    n_regexp_evaluated = Connection.count_regexp()
+                    results = index.search(
+                        tarajem_name, search_query, case_sensitive,
+                        match_whole_word, with_rank=with_rank,
+                        is_interrupted=is_interrupted, expr=expr)
+                    self.n_regexp_evaluated = Connection.count_regexp(
+                        n_regexp_evaluated, is_final=True)
+                    return results
+
+        # The connection is shared, so always set the pragma explicitly
+        # rather than leaving it on for the next query
+        self.cursor.execute(
+            f'PRAGMA case_sensitive_like = {str(case_sensitive).lower()};')
+        like = '%' + search_query.replace('\\', '\\\\') \
+            .replace('%', '\\%').replace('_', '\\_') + '%'
+        query = f'SELECT sura, aya, text FROM {tarajem_name} ' \
+            "WHERE text LIKE ? ESCAPE '\\'"
+        parameters = (like,)
+
+        if match_whole_word:
+            # LIKE ignores the case of ASCII letters only, so it can only
+            # prefilter the rows for REGEXP if the query has no other letters
+            if case_sensitive \
+                    or search_query.isascii():
+                # The terms are evaluated in order, so REGEXP only gets the
+                # rows containing the query
+                query = query + ' AND text REGEXP ?'
+                parameters = parameters + (expr,)
             else:
-                query = query + 'WHERE text LIKE ?'
-                self.cursor.execute(query, ('%'+search_query+'%',))
-            return self.cursor.fetchall()
-        return []
+                query = f'SELECT sura, aya, text FROM {tarajem_name} ' \
+                    'WHERE text REGEXP ?'
+                parameters = (expr,)
+
+        n_regexp_evaluated = Connection.count_regexp()
+        results = self.fetch(query, parameters, is_interrupted)
+        self.n_regexp_evaluated = Connection.count_regexp(n_regexp_evaluated,
+                                                          is_final=True)
+        if with_rank:
+            results = [result + (float('inf'),) for result in results]
+        return results
 
     def get_tarajem_text(
             self,
@@ -369,3 +703,510 @@ class Tarajem(Model):
             self.cursor.execute(query, (surah_no, ayah_no))
             return self.cursor.fetchone()
         return []
+
+
+# Strip the tashkeel, the Quranic annotation signs and the tatweel, and unify
+# the variants of alef, yaa and taa marbuta
+ARABIC_NORMALIZATION_TABLE = str.maketrans(
+    {**{char: None for char in range(0x064b, 0x0660)},
+     **{char: None for char in range(0x06d6, 0x06ee)},
+     0x0640: None, 0x0670: None,
+     'آ': 'ا', 'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+     'ى': 'ي', 'ی': 'ي',
+     'ة': 'ه'})
+
+
+def normalize_arabic(text: str) -> str:
+    """Normalize an Arabic text to be searched regardless of its spelling."""
+    return text.translate(ARABIC_NORMALIZATION_TABLE)
+
+
+class SearchIndex(Model):
+    """Full-text search index of the Musshaf texts and the tarajem/tafaser
+
+    The ayah texts and every downloaded tarajem are copied into FTS5 tables,
+    so searching does not scan every row with `LIKE` or `REGEXP`. The index of
+    the ayah texts is built on first use, whereas the index of a tarajem is
+    built right after it has been downloaded (or on first use for those
+    downloaded by the previous versions, before searching them). The ayah
+    texts are indexed in their normalized form, so that Arabic queries match
+    whatever their tashkeel and letter variants.
+    """
+
+    # Increase whenever the structure of the index changes, so that the index
+    # built by the previous versions is rebuilt
+    version: int = 2
+
+    _lock = Lock()  # so that the indexes are built one at a time, e.g. while
+                    # a tarajem is being downloaded
+
+    def __init__(self) -> None:
+        self.database_filepath = path.join(const.USER_DATA_PATH, 'search.db')
+
+    def __enter__(self) -> SearchIndex:
+        super().__enter__()
+
+        self.cursor.execute('PRAGMA user_version')
+        if self.cursor.fetchone()[0] != self.version:
+            for index_name in self.get_index_names():
+                self.cursor.execute(f'DROP TABLE {index_name}')
+            self.cursor.execute(f'PRAGMA user_version = {self.version}')
+            self.connection.commit()
+
+        return self
+
+    def get_index_names(self) -> list:
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'"
+                            " AND sql LIKE 'CREATE VIRTUAL TABLE%'")
+        return [result[0] for result in self.cursor.fetchall()]
+
+    def is_index_exist(
+            self,
+            index_name: str) -> bool:
+        self.cursor.execute('SELECT name FROM sqlite_master WHERE name=?',
+                            (index_name,))
+        if self.cursor.fetchone():
+            return True
+        return False
+
+    def create_index(
+            self,
+            index_name: str,
+            rows: list,
+            is_normalized: bool = False) -> None:
+        """Create a full-text search index from (id, sura, aya, text) rows
+
+        If `is_normalized` is True, the texts are indexed in the form given by
+        `normalize_arabic()` in another column, whereas the original texts are
+        only stored to be displayed.
+        """
+        with self._lock:
+            self.cursor.execute(f'DROP TABLE IF EXISTS {index_name}')
+            if is_normalized:
+                self.cursor.execute(
+                    f'CREATE VIRTUAL TABLE {index_name} USING fts5 (sura '
+                    'UNINDEXED, aya UNINDEXED, text UNINDEXED, normalized, '
+                    "tokenize='unicode61 remove_diacritics 2')")
+                self.cursor.executemany(
+                    f'INSERT INTO {index_name} (rowid, sura, aya, text, '
+                    'normalized) VALUES (?, ?, ?, ?, ?)',
+                    [row + (normalize_arabic(row[3]),) for row in rows])
+            else:
+                self.cursor.execute(
+                    f'CREATE VIRTUAL TABLE {index_name} USING fts5 (sura '
+                    'UNINDEXED, aya UNINDEXED, text, '
+                    "tokenize='unicode61 remove_diacritics 2')")
+                self.cursor.executemany(
+                    f'INSERT INTO {index_name} (rowid, sura, aya, text) '
+                    'VALUES (?, ?, ?, ?)', rows)
+            self.connection.commit()
+
+    def create_texts_index(self) -> None:
+        with Metadata() as metadata:
+            metadata.cursor.execute('SELECT id, sura, aya, text FROM texts')
+            self.create_index('texts', metadata.cursor.fetchall(),
+                              is_normalized=True)
+
+    def create_tarajem_index(
+            self,
+            tarajem_name: str) -> None:
+        with Tarajem() as tarajem:
+            if not tarajem.is_tarajem_exist(tarajem_name):
+                return
+            tarajem.cursor.execute(
+                f'SELECT id, sura, aya, text FROM {tarajem_name}')
+            self.create_index(tarajem_name, tarajem.cursor.fetchall())
+
+    def create_missing_tarajem_indexes(
+            self,
+            tarajem_names: list) -> None:
+        """Build the indexes of the tarajem which have none yet, one after
+        the other, so that they can then be searched concurrently"""
+        for tarajem_name in tarajem_names:
+            if not self.is_index_exist(tarajem_name):
+                self.create_tarajem_index(tarajem_name)
+
+    def search(
+            self,
+            index_name: str,
+            search_query: str,
+            case_sensitive: bool = False,
+            match_whole_word: bool = False,
+            is_normalized: bool = False,
+            with_rank: bool = False,
+            is_interrupted: Callable = None,
+            expr: str = None) -> list:
+        """Search an index ordered by relevance
+
+        The query is matched as a phrase of whole words, or of which the last
+        word is a prefix if `match_whole_word` is False. Matching is always
+        case-insensitive in the index, so the case-sensitive search filters
+        the matches afterwards. The query of a normalized index is normalized
+        the same way as its texts.
+
+        If `with_rank` is True, the rank of every match is appended, i.e. the
+        lower the better. Only the matches found so far are returned as soon
+        as `is_interrupted()` returns True, see `Model.fetch()`. If
+        `expr` is given, the matches are also checked by REGEXP, e.g. for the
+        whole words to be matched exactly.
+        """
+        column = 'text'
+        if is_normalized:
+            search_query = normalize_arabic(search_query)
+            column = 'normalized'
+
+        # Quote the query as a phrase, so that the user cannot use the FTS5
+        # query syntax
+        phrase = '"' + search_query.replace('"', '""') + '"'
+        if not match_whole_word:
+            phrase = phrase + '*'
+
+        columns = 'sura, aya, text, rank' if with_rank or is_interrupted \
+            else 'sura, aya, text'
+        query = f'SELECT {columns} FROM {index_name} ' \
+            f'WHERE {index_name} MATCH ?'
+        parameters = (phrase,)
+        if case_sensitive:
+            query = query + f' AND instr({column}, ?) > 0'
+            parameters = parameters + (search_query,)
+        if expr:
+            query = query + f' AND {column} REGEXP ?'
+            parameters = parameters + (expr,)
+        if not is_interrupted:
+            query = query + ' ORDER BY rank'
+            return self.fetch(query, parameters)
+
+        # FTS5 only yields the matches ordered by rank once it has found all
+        # of them, so they are sorted here to keep those found until the
+        # search is interrupted
+        results = self.fetch(query, parameters, is_interrupted)
+        results.sort(key=lambda result: result[3])
+        if not with_rank:
+            results = [result[:3] for result in results]
+        return results
+
+    def get_ayah_texts(
+            self,
+            search_query: str,
+            case_sensitive: bool = False,
+            match_whole_word: bool = False) -> list:
+        if not self.is_index_exist('texts'):
+            self.create_texts_index()
+        return self.search('texts', search_query, case_sensitive,
+                           match_whole_word, is_normalized=True)
+
+    def get_tarajem_texts(
+            self,
+            tarajem_name: str,
+            search_query: str,
+            case_sensitive: bool = False,
+            match_whole_word: bool = False,
+            with_rank: bool = False,
+            is_interrupted: Callable = None) -> list:
+        """Search a tarajem through its index, which is not built here, see
+        `create_missing_tarajem_indexes()`"""
+        if not self.is_index_exist(tarajem_name):
+            return []
+        return self.search(tarajem_name, search_query, case_sensitive,
+                           match_whole_word, with_rank=with_rank,
+                           is_interrupted=is_interrupted)
+
+
+class TrigramIndex:
+    """In-memory trigram index for substring search
+
+    Every text is normalized by `normalize_arabic()` and lowercased, then each
+    run of three characters in it, i.e. trigram, is mapped to the texts
+    containing it. The texts containing every trigram of a query are only the
+    candidates, which are then checked to contain the query itself.
+
+    The index is built on first use and saved as a cache file, which is
+    rebuilt once the database has been modified. Only the ayah texts, i.e.
+    the `texts` table, are searched this way; the tarajem are scanned by
+    `Tarajem.get_tarajem_texts()` instead, though any of their tables can be
+    indexed as well.
+    """
+
+    version: int = 1  # of the cache file
+
+    _indexes: dict = {}  # by table name
+    _lock = Lock()
+
+    def __init__(
+            self,
+            table: str) -> None:
+        model = Metadata() if table == 'texts' else Tarajem()
+        with model:
+            model.cursor.execute(
+                f'SELECT sura, aya, text FROM {table} ORDER BY id')
+            self.rows = model.cursor.fetchall()
+        self.texts = [self.normalize(row[2]) for row in self.rows]
+
+        database_stat = stat(model.database_filepath)
+        key = (self.version, table, database_stat.st_mtime_ns,
+               database_stat.st_size)
+        cache_filepath = path.join(const.USER_CACHE_PATH, f'{table}.trigrams')
+
+        self.postings = self.load(cache_filepath, key)
+        if self.postings is None:
+            self.postings = self.build(self.texts)
+            self.save(cache_filepath, key, self.postings)
+
+    @classmethod
+    def get(
+            cls,
+            table: str) -> TrigramIndex:
+        with cls._lock:
+            if table not in cls._indexes:
+                cls._indexes[table] = cls(table)
+            return cls._indexes[table]
+
+    @classmethod
+    def invalidate(
+            cls,
+            table: str = None) -> None:
+        with cls._lock:
+            if table is None:
+                cls._indexes.clear()
+            else:
+                cls._indexes.pop(table, None)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return normalize_arabic(text).lower()
+
+    @staticmethod
+    def get_trigrams(text: str) -> set:
+        return {text[i:i+3] for i in range(len(text)-2)}
+
+    @classmethod
+    def build(
+            cls,
+            texts: list) -> dict:
+        postings = {}
+        for text_no, text in enumerate(texts):
+            for trigram in cls.get_trigrams(text):
+                if trigram not in postings:
+                    postings[trigram] = array('I')
+                postings[trigram].append(text_no)
+        return postings
+
+    @staticmethod
+    def load(
+            filepath: str,
+            key: tuple) -> dict:
+        """Load the postings from a cache file, or None if it is outdated."""
+        try:
+            with open(filepath, 'rb') as f:
+                cached_key, postings = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if cached_key != key:
+            return None
+        return postings
+
+    @staticmethod
+    def save(
+            filepath: str,
+            key: tuple,
+            postings: dict) -> None:
+        try:
+            makedirs(path.dirname(filepath), exist_ok=True)
+            # Write it whole, so that a half-written file is never loaded
+            with open(f'{filepath}.tmp', 'wb') as f:
+                pickle.dump((key, postings), f, pickle.HIGHEST_PROTOCOL)
+            replace(f'{filepath}.tmp', filepath)
+        except OSError as error:
+            print(f'Cannot save the trigram index to `{filepath}`: {error}')
+
+    def search(
+            self,
+            query: str,
+            case_sensitive: bool = False) -> list:
+        """Get the (sura, aya, text) of the texts containing the query
+
+        The normalized forms of the texts are searched, so that the case of
+        the letters is only matched if `case_sensitive` is True.
+        """
+        normalized_query = self.normalize(query)
+        trigrams = self.get_trigrams(normalized_query)
+        if trigrams:
+            # Intersect starting from the rarest trigram
+            postings = sorted((self.postings.get(trigram, ())
+                               for trigram in trigrams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            candidates = sorted(candidates)
+        else:
+            candidates = range(len(self.texts))
+
+        if case_sensitive:
+            query = normalize_arabic(query)
+            return [self.rows[text_no] for text_no in candidates
+                    if query in normalize_arabic(self.rows[text_no][2])]
+        return [self.rows[text_no] for text_no in candidates
+                if normalized_query in self.texts[text_no]]
+
+
+class AyahIndex:
+    """In-memory location index of all ayahs of a Musshaf
+
+    Every ayah is given a global number, i.e. its zero-based position in the
+    whole Quran, which is then mapped to its page, juz, hizb quarter, manzil
+    and ruku numbers in compact arrays. The reverse mappings store the global
+    number of the first ayah of every page and division. The index is built
+    once per opened Musshaf, so that navigating does not need any query.
+    """
+
+    _indexes: dict = {}  # by Musshaf ID
+    _lock = Lock()
+
+    def __init__(
+            self,
+            musshaf_name: str) -> None:
+        with Metadata() as metadata, \
+             Musshaf() as musshaf:
+            surahs = metadata.get_surahs()
+            self.surah_starts = array('h', [surah.start for surah in surahs])
+            self.surah_lengths = array('h', [surah.ayas for surah in surahs])
+            n_ayahs = self.surah_starts[-1] + self.surah_lengths[-1]
+
+            # Label every ayah with the division containing it
+            surayas = [(surah_no, ayah_no)
+                       for surah_no, surah_length
+                       in enumerate(self.surah_lengths, 1)
+                       for ayah_no in range(1, surah_length+1)]
+            divisions = {}
+            for table in ('juzs', 'hizbs', 'manzils', 'rukus'):
+                boundary = Boundary.get(table, metadata.cursor)
+                divisions[table] = (
+                    boundary.starts,
+                    array('h', boundary.get_division_nos(surayas)))
+            self.juz_starts, self.ayah_juzs = divisions['juzs']
+            self.hizb_starts, self.ayah_hizbs = divisions['hizbs']
+            self.manzil_starts, self.ayah_manzils = divisions['manzils']
+            self.ruku_starts, self.ayah_rukus = divisions['rukus']
+
+            # Map every ayah to the last page it is written on, and every page
+            # to the first ayah written on it
+            self.ayah_pages = array('h', [-1]) * n_ayahs
+            self.page_starts = array('h')
+            if musshaf.is_musshaf_exist(musshaf_name):
+                musshaf.cursor.execute(
+                    f'SELECT page, sura, aya FROM {musshaf_name} ORDER BY id')
+                for page_no, surah_no, ayah_no in musshaf.cursor.fetchall():
+                    ayah_id = self.get_ayah_id(surah_no, ayah_no)
+                    if ayah_id < 0:
+                        continue
+                    self.ayah_pages[ayah_id] = page_no
+                    if page_no >= len(self.page_starts):
+                        self.page_starts.extend(
+                            [-1] * (page_no - len(self.page_starts) + 1))
+                    if self.page_starts[page_no] < 0:
+                        self.page_starts[page_no] = ayah_id
+
+    @classmethod
+    def get(
+            cls,
+            musshaf_name: str) -> AyahIndex:
+        with cls._lock:
+            if musshaf_name not in cls._indexes:
+                cls._indexes[musshaf_name] = cls(musshaf_name)
+            return cls._indexes[musshaf_name]
+
+    @classmethod
+    def invalidate(
+            cls,
+            musshaf_name: str = None) -> None:
+        with cls._lock:
+            if musshaf_name is None:
+                cls._indexes.clear()
+            else:
+                cls._indexes.pop(musshaf_name, None)
+
+    def get_ayah_id(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        if not 1 <= surah_no <= len(self.surah_starts) \
+                or not 1 <= ayah_no <= self.surah_lengths[surah_no-1]:
+            return -1
+        return self.surah_starts[surah_no-1] + ayah_no - 1
+
+    def get_suraya(
+            self,
+            ayah_id: int = -1,
+            page_no: int = None,
+            juz_no: int = None,
+            hizb_no: int = None,
+            manzil_no: int = None,
+            ruku_no: int = None) -> tuple:
+        """Get the surah-ayah numbers of a global ayah number or of the first
+        ayah of a page or a division. Returns (-1, -1) if there is none."""
+        if page_no is not None:
+            ayah_id = self._get_item(self.page_starts, page_no)
+        elif juz_no is not None:
+            ayah_id = self._get_item(self.juz_starts, juz_no-1)
+        elif hizb_no is not None:
+            ayah_id = self._get_item(self.hizb_starts, hizb_no-1)
+        elif manzil_no is not None:
+            ayah_id = self._get_item(self.manzil_starts, manzil_no-1)
+        elif ruku_no is not None:
+            ayah_id = self._get_item(self.ruku_starts, ruku_no-1)
+        if ayah_id < 0 \
+                or ayah_id >= len(self.ayah_pages):
+            return (-1, -1)
+
+        surah_idx = bisect_right(self.surah_starts, ayah_id) - 1
+        return (surah_idx+1, ayah_id - self.surah_starts[surah_idx] + 1)
+
+    def get_surah_length(
+            self,
+            surah_no: int) -> int:
+        return self._get_item(self.surah_lengths, surah_no-1)
+
+    def get_page_no(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        return self._get_item(self.ayah_pages,
+                              self.get_ayah_id(surah_no, ayah_no))
+
+    def get_juz_no(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        return self._get_item(self.ayah_juzs,
+                              self.get_ayah_id(surah_no, ayah_no))
+
+    def get_hizb_no(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        return self._get_item(self.ayah_hizbs,
+                              self.get_ayah_id(surah_no, ayah_no))
+
+    def get_manzil_no(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        return self._get_item(self.ayah_manzils,
+                              self.get_ayah_id(surah_no, ayah_no))
+
+    def get_ruku_no(
+            self,
+            surah_no: int,
+            ayah_no: int) -> int:
+        return self._get_item(self.ayah_rukus,
+                              self.get_ayah_id(surah_no, ayah_no))
+
+    def _get_item(
+            self,
+            items: array,
+            index: int) -> int:
+        if 0 <= index < len(items):
+            return items[index]
+        return -1
@@ -18,7 +18,6 @@
 from cairo import Context
 from gi.repository import Gdk
 from gi.repository import GdkPixbuf
-from gi.repository import GLib
 from gi.repository import GObject
 from gi.repository import Gtk
 from io import BytesIO
@@ -33,8 +32,12 @@ from zipfile import ZipFile
 from . import constants as const
 from . import globals as glob
 from .animation import Animation
+from .model import AyahIndex
 from .model import Metadata
 from .model import Musshaf
+from .page import PageCache
+from .page import PagePrefetcher
+from .page import PagePyramid
 
 import faulthandler
 
@@ -76,18 +79,19 @@ class MusshafViewer(Gtk.Overlay):
         self.setup_viewer()
 
     def setup_viewer(self) -> None:
+        self.musshaf_name = glob.musshaf_name
         self.musshaf_dir = \
             path.join(const.USER_DATA_PATH, f'musshaf/{glob.musshaf_name}')
 
         # Load a sample image page of the opened Musshaf ID by assuming that
         # all image pages have the same size
         page_filepath = path.join(self.musshaf_dir, '1.jpg')
-        page_image = GdkPixbuf.Pixbuf.new_from_file(page_filepath)
 
         # Store the actual image page size, because it will be used to
-        # calculate the image page size after scalling by the page zoom value
-        self.page_width = page_image.get_width()
-        self.page_height = page_image.get_height()
+        # calculate the image page size after scalling by the page zoom value.
+        # Only the header of the image is read, not to decode it whole.
+        _, self.page_width, self.page_height = \
+            GdkPixbuf.Pixbuf.get_file_info(page_filepath)
 
     @Gtk.Template.Callback()
     def focus_on_ayah(
@@ -176,20 +180,15 @@ class MusshafViewer(Gtk.Overlay):
             page_no = glob.page_number
         page_no = page_no + self.id
 
-        # Obtain all ayah bounding boxes of the corresponding page and then
-        # scale them all by the page zoom value
-        if self.page_no != page_no \
-                or regenerate:
-            with Musshaf() as musshaf:
-                bboxes = musshaf.get_bboxes(page_no)
-                for idx_bbox in range(len(bboxes)):
-                    surah_no_, ayah_no_, x, y, w, h = bboxes[idx_bbox]
-                    bboxes[idx_bbox] = (surah_no_, ayah_no_,
-                                        x * glob.page_scale,
-                                        y * glob.page_scale,
-                                        w * glob.page_scale,
-                                        h * glob.page_scale)
-                self.bboxes = bboxes
+        # Obtain the page image and all ayah bounding boxes of the
+        # corresponding page, scaled by the page zoom value, unless they have
+        # been prefetched
+        is_reloading = self.page_no != page_no \
+            or regenerate
+        if is_reloading:
+            page_image, self.bboxes, is_preview = PagePrefetcher.get(
+                self.musshaf_name, page_no, self.page_width,
+                self.page_height, is_preview_allowed=regenerate)
 
         # Set focus on the first ayah on the page
         self.bboxes_focused = \
@@ -203,38 +202,50 @@ class MusshafViewer(Gtk.Overlay):
             self.emit('focused-page-changed')
 
         # No need to reload the page image if the page number does not change
-        if self.page_no == page_no \
-                and not regenerate:
+        if not is_reloading:
             self.eventbox.queue_draw()
             return
         self.page_no = page_no
 
-        # If the page number is valid, load the corresponding image page.
-        # Otherwise, load a blank image page.
-        try:
-            page_filepath = path.join(self.musshaf_dir, f'{page_no}.jpg')
-            self.page_image = GdkPixbuf.Pixbuf.new_from_file(page_filepath)
-        except:
-            page_filepath = f'{const.RESOURCE_PATH}/img/page_blank.png'
-            self.page_image = GdkPixbuf.Pixbuf.new_from_resource(page_filepath)
-
-        # Scale the newly loaded image page by the page zoom value and then
-        # display it
-        page_width = round(self.page_width * glob.page_scale)
-        page_height = round(self.page_height * glob.page_scale)
-        page_image = self.page_image.scale_simple(
-            page_width, page_height, GdkPixbuf.InterpType.BILINEAR)
-
-        # Invert the colors of the page image
-        if glob.night_mode:
-            page_image_bytes = bytearray(page_image.get_pixels())
-            page_image_bytes = bytearray(x ^ 0xff for x in page_image_bytes)
-            page_image = GdkPixbuf.Pixbuf.new_from_bytes(
-                GLib.Bytes.new(page_image_bytes), GdkPixbuf.Colorspace.RGB,
-                False, 8, page_width, page_height, page_image.get_rowstride())
-
+        self.page_image = page_image
         self.image.set_from_pixbuf(page_image)
-        self.eventbox.set_size_request(page_width, page_height)
+        self.eventbox.set_size_request(page_image.get_width(),
+                                       page_image.get_height())
+
+        # Prepare the pages around, which are most likely to be displayed
+        # next, along with the page itself if only its preview is displayed
+        step = 2 if glob.dual_page else 1
+        page_nos = [page_no] if is_preview else []
+        for distance in range(1, PagePrefetcher.depth + 1):
+            page_nos.append(page_no + step * distance)
+            if page_no - step * distance > 0:
+                page_nos.append(page_no - step * distance)
+        PagePrefetcher.prefetch(self.id, self.musshaf_name, page_nos,
+                                self.page_width, self.page_height)
+        if is_preview:
+            PagePrefetcher.when_rendered(
+                self.musshaf_name, page_no, self.refine, page_no,
+                glob.page_scale, glob.night_mode)
+
+        # Save the page at the zoom steps around, for the next zoom changes
+        PagePyramid.generate(self.musshaf_name, [page_no], self.page_width,
+                             self.page_height, glob.page_scale)
+
+    def refine(
+            self,
+            page_no: int,
+            page_scale: float,
+            night_mode: bool) -> bool:
+        """Replace the preview of the page image by the page image rendered
+        at the zoom value, unless anything has changed meanwhile"""
+        if (self.page_no, glob.page_scale, glob.night_mode) \
+                == (page_no, page_scale, night_mode):
+            page_image, _, _ = PagePrefetcher.get(
+                self.musshaf_name, page_no, self.page_width,
+                self.page_height)
+            self.page_image = page_image
+            self.image.set_from_pixbuf(page_image)
+        return False
 
 
 @Gtk.Template(resource_path=f'{const.RESOURCE_PATH}/ui/musshaf_dialog.ui')
@@ -463,6 +474,11 @@ class MusshafDialog(Gtk.Window):
                     model.cursor.execute(query)
 
                     model.connection.commit()
+
+                    model.create_indexes(glob.musshaf_name)
+
+                    # Drop any location index built before the table existed
+                    AyahIndex.invalidate(glob.musshaf_name)
                 else:
                     downloaded_length += bbox_length
 
@@ -519,6 +535,8 @@ class MusshafDialog(Gtk.Window):
                     'object-select-symbolic', Gtk.IconSize.BUTTON)
                 row.icon_status.set_opacity(1)
                 glob.musshaf_name = row.id
+                PageCache.invalidate(row.id)
+                PagePyramid.invalidate(row.id)
                 Animation.scroll_to(self.scrolledwindow, row, 200)
 
             row.spinner.hide()
@@ -22,8 +22,8 @@ from os import path
 
 from . import constants as const
 from . import globals as glob
+from .model import AyahIndex
 from .model import Metadata
-from .model import Musshaf
 
 
 @Gtk.Template(resource_path=f'{const.RESOURCE_PATH}/ui/navigation.ui')
@@ -73,12 +73,12 @@ class NavigationPopover(Gtk.PopoverMenu):
         self.setup_form()
 
     def setup_form(self) -> None:
-        with Metadata() as metadata, \
-             Musshaf() as musshaf:
+        with Metadata() as metadata:
             # Set all initial values of the form according to the opened
             # Musshaf ID
-            self.page_no_start = musshaf.get_page_no(1, 1)
-            self.page_no_end = musshaf.get_page_no(114, 6)
+            index = AyahIndex.get(glob.musshaf_name)
+            self.page_no_start = index.get_page_no(1, 1)
+            self.page_no_end = index.get_page_no(114, 6)
             musshaf_dir = \
                 path.join(const.USER_DATA_PATH, f'musshaf/{glob.musshaf_name}')
             self.page_length.set_text(
@@ -90,10 +90,10 @@ class NavigationPopover(Gtk.PopoverMenu):
             # Populate a list of surah names
             liststore = Gtk.ListStore(str, str)
             for surah in metadata.get_surahs():
-                surah_no = str(surah[0])
-                liststore.append([surah_no, f'{surah_no}. {surah[5]}'])
+                surah_no = str(surah.id)
+                liststore.append([surah_no, f'{surah_no}. {surah.aname}'])
                 self.combo_surah_name.append(
-                    surah_no, f'{surah_no}. {surah[4]}')
+                    surah_no, f'{surah_no}. {surah.tname}')
             self.complete_surah_name.set_model(liststore)
             self.complete_surah_name.set_text_column(1)
 
@@ -224,9 +224,8 @@ class NavigationPopover(Gtk.PopoverMenu):
                     and not (glob.surah_number == 1
                              and glob.ayah_number == 1):
                 glob.surah_number = max(1, glob.surah_number - 1)
-                with Metadata() as metadata:
-                    glob.ayah_number = metadata.get_surah_length(
-                        glob.surah_number)
+                glob.ayah_number = AyahIndex.get(
+                    glob.musshaf_name).get_surah_length(glob.surah_number)
                 self.update('ayah-number')
             else:
                 self.emit('reload-telaawa-player')
@@ -276,81 +275,82 @@ class NavigationPopover(Gtk.PopoverMenu):
         if not self.in_focus():
             return
 
-        with Musshaf() as musshaf, \
-             Metadata() as metadata:
-            if keyword == 'page-number':
-                glob.surah_number = musshaf.get_surah_no(glob.page_number)
-                glob.ayah_number = musshaf.get_ayah_no(glob.page_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                hizb_no = metadata.get_hizb_no(glob.surah_number, glob.ayah_number)
-                glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
-                glob.quarter_number = hizb_no%4 - 1
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            elif keyword == 'surah-number':
-                glob.ayah_number = 1
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                hizb_no = metadata.get_hizb_no(glob.surah_number, glob.ayah_number)
-                glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
-                glob.quarter_number = hizb_no%4 - 1
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            elif keyword == 'juz-number':
-                glob.surah_number = metadata.get_surah_no(juz_no=glob.juz_number)
-                glob.ayah_number = metadata.get_ayah_no(juz_no=glob.juz_number)
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                hizb_no = metadata.get_hizb_no(glob.surah_number, glob.ayah_number)
-                glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
-                glob.quarter_number = 0
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            elif keyword == 'hizb-number':
-                hizb_no = (glob.hizb_number-1)*4 + 1
-                glob.surah_number = metadata.get_surah_no(hizb_no=hizb_no)
-                glob.ayah_number = metadata.get_ayah_no(hizb_no=hizb_no)
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                glob.quarter_number = 0
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            elif keyword == 'quarter-number':
-                hizb_no = (glob.hizb_number-1)*4 + 1 + glob.quarter_number
-                glob.surah_number = metadata.get_surah_no(hizb_no=hizb_no)
-                glob.ayah_number = metadata.get_ayah_no(hizb_no=hizb_no)
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            elif keyword == 'manzil-number':
-                glob.surah_number = metadata.get_surah_no(manzil_no=glob.manzil_number)
-                glob.ayah_number = metadata.get_ayah_no(manzil_no=glob.manzil_number)
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                hizb_no = metadata.get_hizb_no(glob.surah_number, glob.ayah_number)
-                glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
-                glob.quarter_number = 0
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            elif keyword == 'ruku-number':
-                glob.surah_number = metadata.get_surah_no(ruku_no=glob.ruku_number)
-                glob.ayah_number = metadata.get_ayah_no(ruku_no=glob.ruku_number)
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                hizb_no = metadata.get_hizb_no(glob.surah_number, glob.ayah_number)
-                glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
-                glob.quarter_number = 0
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-            else:
-                # if the `keyword` is not specified, it is assumed that the
-                # ayah number has been changed
-                glob.page_number = musshaf.get_page_no(glob.surah_number, glob.ayah_number)
-                glob.juz_number = metadata.get_juz_no(glob.surah_number, glob.ayah_number)
-                hizb_no = metadata.get_hizb_no(glob.surah_number, glob.ayah_number)
-                glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
-                glob.quarter_number = hizb_no%4 - 1
-                glob.manzil_number = metadata.get_manzil_no(glob.surah_number, glob.ayah_number)
-                glob.ruku_number = metadata.get_ruku_no(glob.surah_number, glob.ayah_number)
-            surah_length = metadata.get_surah_length(glob.surah_number)
+        # All lookups are answered by the in-memory index of the opened
+        # Musshaf rather than by querying the databases
+        index = AyahIndex.get(glob.musshaf_name)
+        if keyword == 'page-number':
+            glob.surah_number, glob.ayah_number = \
+                index.get_suraya(page_no=glob.page_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            hizb_no = index.get_hizb_no(glob.surah_number, glob.ayah_number)
+            glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
+            glob.quarter_number = hizb_no%4 - 1
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        elif keyword == 'surah-number':
+            glob.ayah_number = 1
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            hizb_no = index.get_hizb_no(glob.surah_number, glob.ayah_number)
+            glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
+            glob.quarter_number = hizb_no%4 - 1
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        elif keyword == 'juz-number':
+            glob.surah_number, glob.ayah_number = \
+                index.get_suraya(juz_no=glob.juz_number)
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            hizb_no = index.get_hizb_no(glob.surah_number, glob.ayah_number)
+            glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
+            glob.quarter_number = 0
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        elif keyword == 'hizb-number':
+            hizb_no = (glob.hizb_number-1)*4 + 1
+            glob.surah_number, glob.ayah_number = \
+                index.get_suraya(hizb_no=hizb_no)
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            glob.quarter_number = 0
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        elif keyword == 'quarter-number':
+            hizb_no = (glob.hizb_number-1)*4 + 1 + glob.quarter_number
+            glob.surah_number, glob.ayah_number = \
+                index.get_suraya(hizb_no=hizb_no)
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        elif keyword == 'manzil-number':
+            glob.surah_number, glob.ayah_number = \
+                index.get_suraya(manzil_no=glob.manzil_number)
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            hizb_no = index.get_hizb_no(glob.surah_number, glob.ayah_number)
+            glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
+            glob.quarter_number = 0
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        elif keyword == 'ruku-number':
+            glob.surah_number, glob.ayah_number = \
+                index.get_suraya(ruku_no=glob.ruku_number)
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            hizb_no = index.get_hizb_no(glob.surah_number, glob.ayah_number)
+            glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
+            glob.quarter_number = 0
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+        else:
+            # if the `keyword` is not specified, it is assumed that the
+            # ayah number has been changed
+            glob.page_number = index.get_page_no(glob.surah_number, glob.ayah_number)
+            glob.juz_number = index.get_juz_no(glob.surah_number, glob.ayah_number)
+            hizb_no = index.get_hizb_no(glob.surah_number, glob.ayah_number)
+            glob.hizb_number = hizb_no//4 + (hizb_no%4 > 0)
+            glob.quarter_number = hizb_no%4 - 1
+            glob.manzil_number = index.get_manzil_no(glob.surah_number, glob.ayah_number)
+            glob.ruku_number = index.get_ruku_no(glob.surah_number, glob.ayah_number)
+        surah_length = index.get_surah_length(glob.surah_number)
 
         self.is_updating = True
 
@@ -0,0 +1,624 @@
+# page.py
+#
+# Copyright 2021 Naufan Rusyda Faikar
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Rendering of the Musshaf pages
+
+The page images are prepared here, apart from the viewer widgets, so that they
+can be rendered by any thread, e.g. to prefetch the next pages.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from gi.repository import GdkPixbuf
+from gi.repository import GLib
+from os import listdir
+from os import makedirs
+from os import path
+from os import remove
+from os import replace
+from os import stat
+from os import utime
+from os import walk
+from shutil import rmtree
+from threading import Lock
+from time import perf_counter
+from typing import Callable
+
+from . import constants as const
+from . import globals as glob
+from .model import Musshaf
+
+# Map every byte to its inverse, so that the colors of a page image are
+# inverted by a single `bytes.translate()`, i.e. in C rather than byte by byte
+# in Python
+INVERSION_TABLE = bytes(range(255, -1, -1))
+
+
+class PageCache:
+    """Memory-budgeted LRU cache of the decoded page images
+
+    Decoding a page image is the most expensive part of turning a page, so the
+    decoded pages are kept for both viewers, keyed by the Musshaf and the page
+    number, until their pixels exceed `max_bytes`. Flipping back and forth
+    within the pages kept then never decodes them again.
+    """
+
+    max_bytes: int = 256 * 1024 * 1024
+
+    _pages: OrderedDict = OrderedDict()
+    _lock = Lock()
+    n_bytes: int = 0
+    n_hits: int = 0
+    n_misses: int = 0
+
+    # Statistics of the decoder, for confirming that decoding at the scaled
+    # size actually pays off
+    n_decoded: int = 0
+    n_decoded_bytes: int = 0
+    decoding_time: float = 0  # in seconds
+
+    @classmethod
+    def get(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int = None,
+            page_height: int = None,
+            is_decoding: bool = True) -> GdkPixbuf.Pixbuf:
+        """Return the decoded page image, decoding it if not cached
+
+        If a size is given, the page image is taken from `PagePyramid` if it
+        has been saved at that size, or decoded at that size, see `decode()`.
+        If `is_decoding` is False, return None rather than decoding it. Raise
+        GLib.Error if the page image cannot be decoded, e.g. there is no such
+        page.
+        """
+        key = (musshaf_name, page_no)
+        if page_width:
+            key = key + (page_width, page_height)
+        page_image = cls.lookup(key)
+        if page_image:
+            return page_image
+
+        if page_width:
+            page_image = PagePyramid.load(musshaf_name, page_no, page_width,
+                                          page_height)
+        if page_image is None:
+            if not is_decoding:
+                return None
+            page_image = cls.decode(musshaf_name, page_no, page_width,
+                                    page_height)
+
+        cls.put(key, page_image)
+        return page_image
+
+    @classmethod
+    def decode(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int = None,
+            page_height: int = None,
+            is_counted: bool = True) -> GdkPixbuf.Pixbuf:
+        """Decode a page image, at the given size if any
+
+        A page image is decoded straight to a smaller size, which is much
+        cheaper, since the JPEG decoder then skips most of the pixels rather
+        than decoding them only to be scaled away. The decoder does no better
+        at upscaling, so then the page image is decoded whole and scaled
+        afterwards. The lock is not held, so that other pages can be looked up
+        meanwhile. If `is_counted` is False, the decoding is left out of the
+        statistics, e.g. when done in the background by `PagePyramid`.
+        """
+        page_filepath = path.join(const.USER_DATA_PATH,
+                                  f'musshaf/{musshaf_name}/{page_no}.jpg')
+        start = perf_counter()
+        if page_width is None:
+            page_image = GdkPixbuf.Pixbuf.new_from_file(page_filepath)
+        elif page_width < GdkPixbuf.Pixbuf.get_file_info(page_filepath)[1]:
+            page_image = GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                page_filepath, page_width, page_height, False)
+        else:
+            page_image = GdkPixbuf.Pixbuf.new_from_file(page_filepath) \
+                .scale_simple(page_width, page_height,
+                              GdkPixbuf.InterpType.BILINEAR)
+        if not is_counted:
+            return page_image
+        with cls._lock:
+            cls.n_decoded += 1
+            cls.n_decoded_bytes += page_image.get_byte_length()
+            cls.decoding_time += perf_counter() - start
+        return page_image
+
+    @classmethod
+    def lookup(
+            cls,
+            key: tuple) -> GdkPixbuf.Pixbuf:
+        """Return a cached page image, or None
+
+        Besides the decoded pages, any page image derived from them is cached
+        by a key starting with the Musshaf, e.g. the inverted ones.
+        """
+        with cls._lock:
+            page_image = cls._pages.get(key)
+            if page_image is None:
+                cls.n_misses += 1
+            else:
+                cls.n_hits += 1
+                cls._pages.move_to_end(key)
+            return page_image
+
+    @classmethod
+    def peek(
+            cls,
+            key: tuple) -> GdkPixbuf.Pixbuf:
+        """Return a cached page image, or None, leaving both the statistics
+        and the order of eviction unchanged"""
+        with cls._lock:
+            return cls._pages.get(key)
+
+    @classmethod
+    def put(
+            cls,
+            key: tuple,
+            page_image: GdkPixbuf.Pixbuf) -> None:
+        with cls._lock:
+            if key in cls._pages:
+                cls.n_bytes -= cls._pages.pop(key).get_byte_length()
+            cls._pages[key] = page_image
+            cls.n_bytes += page_image.get_byte_length()
+            while cls.n_bytes > cls.max_bytes \
+                    and cls._pages:
+                _, evicted_image = cls._pages.popitem(last=False)
+                cls.n_bytes -= evicted_image.get_byte_length()
+
+    @classmethod
+    def invalidate(
+            cls,
+            musshaf_name: str = None) -> None:
+        """Forget the pages of a Musshaf, e.g. after it has been downloaded
+        again, or all pages if not given"""
+        with cls._lock:
+            for key in list(cls._pages):
+                if musshaf_name is None \
+                        or key[0] == musshaf_name:
+                    cls.n_bytes -= cls._pages.pop(key).get_byte_length()
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            n_lookups = cls.n_hits + cls.n_misses
+            n_decoded = cls.n_decoded or 1
+            return {'hits': cls.n_hits, 'misses': cls.n_misses,
+                    'hit-rate': cls.n_hits / n_lookups if n_lookups else 0,
+                    'size': len(cls._pages), 'bytes': cls.n_bytes,
+                    'decoded': cls.n_decoded,
+                    'decoding-ms-per-page':
+                        cls.decoding_time * 1000 / n_decoded,
+                    'decoded-bytes-per-page':
+                        cls.n_decoded_bytes // n_decoded}
+
+
+def render_page(
+        musshaf_name: str,
+        page_no: int,
+        page_width: int,
+        page_height: int,
+        page_scale: float,
+        night_mode: bool,
+        is_preview_allowed: bool = False) -> tuple:
+    """Prepare a page to be displayed
+
+    Return the page image decoded, scaled by the page zoom value and inverted
+    in night mode, along with the ayah bounding boxes scaled the same way,
+    and whether the page image is only a preview. Widgets are not involved,
+    so that any thread can render pages.
+
+    If `is_preview_allowed` is True and the page has not been decoded at the
+    zoom value yet, the page image saved by `PagePyramid` at the nearest
+    zoom step is scaled instead, which is much quicker than decoding it.
+    """
+    with Musshaf() as musshaf:
+        bboxes = musshaf.get_bboxes(page_no, musshaf_name)
+    for idx_bbox in range(len(bboxes)):
+        surah_no_, ayah_no_, x, y, w, h = bboxes[idx_bbox]
+        bboxes[idx_bbox] = (surah_no_, ayah_no_,
+                            x * page_scale,
+                            y * page_scale,
+                            w * page_scale,
+                            h * page_scale)
+
+    # The inverted page images are cached too, so that turning back to a page
+    # in night mode needs neither decoding, scaling nor inverting it again
+    page_width = round(page_width * page_scale)
+    page_height = round(page_height * page_scale)
+    if night_mode:
+        key = (musshaf_name, page_no, page_scale, 'inverted')
+        page_image = PageCache.lookup(key)
+        if page_image:
+            return page_image, bboxes, False
+
+    # If the page number is valid, load the corresponding image page.
+    # Otherwise, load a blank image page.
+    is_preview = False
+    try:
+        page_image = PageCache.get(musshaf_name, page_no, page_width,
+                                   page_height, not is_preview_allowed)
+        if page_image is None:
+            page_image = PagePyramid.load_nearest(musshaf_name, page_no,
+                                                  page_width)
+            is_preview = page_image is not None
+        if page_image is None:
+            page_image = PageCache.get(musshaf_name, page_no, page_width,
+                                       page_height)
+    except:
+        page_filepath = f'{const.RESOURCE_PATH}/img/page_blank.png'
+        page_image = GdkPixbuf.Pixbuf.new_from_resource(page_filepath)
+
+    # Scale the newly loaded image page by the page zoom value, if not yet
+    if page_image.get_width() != page_width \
+            or page_image.get_height() != page_height:
+        page_image = page_image.scale_simple(
+            page_width, page_height, GdkPixbuf.InterpType.BILINEAR)
+
+    if night_mode:
+        page_image = invert_page(page_image)
+        if not is_preview:
+            PageCache.put(key, page_image)
+
+    return page_image, bboxes, is_preview
+
+
+def invert_page(page_image: GdkPixbuf.Pixbuf) -> GdkPixbuf.Pixbuf:
+    """Invert the colors of a page image, keeping its alpha channel if any"""
+    pixels = page_image.read_pixel_bytes().get_data()
+    inverted_pixels = pixels.translate(INVERSION_TABLE)
+    if page_image.get_has_alpha():
+        # Rows of 8-bit RGBA pixels are never padded, so every alpha value is
+        # at the same stride
+        inverted_pixels = bytearray(inverted_pixels)
+        inverted_pixels[3::4] = pixels[3::4]
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(inverted_pixels), page_image.get_colorspace(),
+        page_image.get_has_alpha(), page_image.get_bits_per_sample(),
+        page_image.get_width(), page_image.get_height(),
+        page_image.get_rowstride())
+
+
+class PagePrefetcher:
+    """Background rendering of the pages around the displayed ones
+
+    Reading is mostly sequential, so after every page change, the viewers ask
+    for the `depth` pages before and after theirs to be rendered by a worker
+    pool. Turning to one of them then only swaps the page image. Renderings
+    are keyed by everything they depend on, so a rendering at another zoom
+    value or night mode is never used, and the ones no viewer wants anymore
+    are dropped.
+    """
+
+    depth: int = 1
+
+    _executor = ThreadPoolExecutor(max_workers=2)
+    _renderings: dict = {}  # by (musshaf, page, scale, night mode)
+    _wanted: dict = {}  # the keys wanted by every viewer
+    _lock = Lock()
+    n_prefetched: int = 0
+    n_used: int = 0
+
+    @classmethod
+    def get(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int,
+            page_height: int,
+            is_preview_allowed: bool = False) -> tuple:
+        """Return a page rendered by `render_page()` for the current zoom
+        value and night mode, rendering it now if not prefetched
+
+        A page still being prefetched is waited for rather than rendered
+        twice.
+        """
+        key = (musshaf_name, page_no, glob.page_scale, glob.night_mode)
+        with cls._lock:
+            rendering = cls._renderings.pop(key, None)
+        if rendering \
+                and not rendering.cancelled() \
+                and not rendering.exception():
+            with cls._lock:
+                cls.n_used += 1
+            return rendering.result()
+        return render_page(musshaf_name, page_no, page_width, page_height,
+                           glob.page_scale, glob.night_mode,
+                           is_preview_allowed)
+
+    @classmethod
+    def prefetch(
+            cls,
+            viewer_id: int,
+            musshaf_name: str,
+            page_nos: list,
+            page_width: int,
+            page_height: int) -> None:
+        keys = [(musshaf_name, page_no, glob.page_scale, glob.night_mode)
+                for page_no in page_nos]
+        with cls._lock:
+            cls._wanted[viewer_id] = set(keys)
+            wanted = set().union(*cls._wanted.values())
+            for key in list(cls._renderings):
+                if key not in wanted:
+                    cls._renderings.pop(key).cancel()
+            for key in keys:
+                if key not in cls._renderings:
+                    cls._renderings[key] = cls._executor.submit(
+                        render_page, key[0], key[1], page_width, page_height,
+                        key[2], key[3])
+                    cls.n_prefetched += 1
+
+    @classmethod
+    def when_rendered(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            callback: Callable,
+            *args) -> None:
+        """Call back in the main loop once a page being prefetched for the
+        current zoom value and night mode has been rendered"""
+        key = (musshaf_name, page_no, glob.page_scale, glob.night_mode)
+        with cls._lock:
+            rendering = cls._renderings.get(key)
+        if rendering:
+            rendering.add_done_callback(
+                lambda rendering: rendering.cancelled()
+                or GLib.idle_add(callback, *args))
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            return {'prefetched': cls.n_prefetched, 'used': cls.n_used,
+                    'pending': len(cls._renderings)}
+
+
+class PagePyramid:
+    """Disk cache of the page images at the zoom steps
+
+    Every zoom step renders the pages again from the original page images.
+    So, the displayed pages are saved in the user cache directory at the
+    current and the neighbouring zoom steps by a background thread, making up
+    a pyramid of page images. Being much smaller, a saved page image is much
+    quicker to decode than the original one, and needs no scaling. It is
+    saved losslessly, so that it is the very page image decoded from the
+    original one rather than a copy degraded by encoding it again. A zoom
+    step can also show the nearest saved page image scaled as a preview,
+    until the page has been rendered at the new zoom value.
+
+    The saved page images are removed, the least recently used first, once
+    they exceed `max_bytes` altogether. Loading a page image updates its
+    modification time, so that the order of use is kept from one session to
+    the next.
+    """
+
+    max_bytes: int = 512 * 1024 * 1024
+
+    _executor = ThreadPoolExecutor(max_workers=1)
+    _pending: set = set()  # the page images being saved
+    _files: OrderedDict = None  # the sizes of the saved page images by their
+                                # path, the least recently used first, once
+                                # the directory has been scanned
+    _lock = Lock()
+    n_bytes: int = 0
+    n_hits: int = 0
+    n_misses: int = 0
+    n_saved: int = 0
+    n_evicted: int = 0
+
+    @staticmethod
+    def get_dirpath(musshaf_name: str) -> str:
+        return path.join(const.USER_CACHE_PATH, 'pages', musshaf_name)
+
+    @classmethod
+    def get_filepath(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int,
+            page_height: int) -> str:
+        return path.join(cls.get_dirpath(musshaf_name),
+                         f'{page_width}x{page_height}', f'{page_no}.png')
+
+    @classmethod
+    def load(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int,
+            page_height: int) -> GdkPixbuf.Pixbuf:
+        """Return the page image saved at the given size, or None"""
+        filepath = cls.get_filepath(musshaf_name, page_no, page_width,
+                                    page_height)
+        page_image = None
+        if path.isfile(filepath):
+            try:
+                page_image = GdkPixbuf.Pixbuf.new_from_file(filepath)
+            except GLib.Error:  # e.g. the file has been truncated
+                pass
+        with cls._lock:
+            if page_image is None:
+                cls.n_misses += 1
+            else:
+                cls.n_hits += 1
+                cls.touch(filepath)
+        return page_image
+
+    @classmethod
+    def load_nearest(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int) -> GdkPixbuf.Pixbuf:
+        """Return the page image saved at the width nearest to the given
+        one, or None"""
+        try:
+            sizes = [tuple(map(int, size.split('x'))) for size
+                     in listdir(cls.get_dirpath(musshaf_name))]
+        except (OSError, ValueError):
+            return None
+        for width, height in sorted(sizes, key=lambda size:
+                                    abs(size[0] - page_width)):
+            page_image = cls.load(musshaf_name, page_no, width, height)
+            if page_image:
+                return page_image
+        return None
+
+    @classmethod
+    def generate(
+            cls,
+            musshaf_name: str,
+            page_nos: list,
+            page_width: int,
+            page_height: int,
+            page_scale: float) -> None:
+        """Save the pages at the zoom step of `page_scale` and at its
+        neighbouring ones, in the background"""
+        if not cls.max_bytes:
+            return
+        for zoom in (page_scale*100, page_scale*100 - const.PAGE_ZOOM_STEP,
+                     page_scale*100 + const.PAGE_ZOOM_STEP):
+            if not const.PAGE_ZOOM_MIN <= round(zoom) \
+                    <= const.PAGE_ZOOM_MAX:
+                continue
+            size = (round(page_width * zoom / 100),
+                    round(page_height * zoom / 100))
+            for page_no in page_nos:
+                key = (musshaf_name, page_no) + size
+                with cls._lock:
+                    if key in cls._pending \
+                            or path.isfile(cls.get_filepath(*key)):
+                        continue
+                    cls._pending.add(key)
+                cls._executor.submit(cls.save, *key)
+
+    @classmethod
+    def save(
+            cls,
+            musshaf_name: str,
+            page_no: int,
+            page_width: int,
+            page_height: int) -> None:
+        """Save a page image, taking the one already rendered at that size
+        if still cached, e.g. at the current zoom step, rather than decoding
+        it again"""
+        key = (musshaf_name, page_no, page_width, page_height)
+        filepath = cls.get_filepath(*key)
+        try:
+            page_image = PageCache.peek(key)
+            if page_image is None:
+                page_image = PageCache.decode(*key, is_counted=False)
+            makedirs(path.dirname(filepath), exist_ok=True)
+            page_image.savev(f'{filepath}.tmp', 'png', [], [])
+            replace(f'{filepath}.tmp', filepath)
+            file_size = stat(filepath).st_size
+            with cls._lock:
+                cls.n_saved += 1
+                cls.add(filepath, file_size)
+        except (GLib.Error, OSError) as error:
+            print(f'Cannot save the page image to `{filepath}`: {error}')
+        finally:
+            with cls._lock:
+                cls._pending.discard(key)
+
+    @classmethod
+    def scan(cls) -> None:
+        """Find the page images saved by the previous sessions, unless done
+        already. The lock is to be held."""
+        if cls._files is not None:
+            return
+        files = []
+        for dirpath, _, filenames in walk(path.join(const.USER_CACHE_PATH,
+                                                    'pages')):
+            for filename in filenames:
+                if not filename.endswith('.png'):
+                    continue
+                filepath = path.join(dirpath, filename)
+                try:
+                    file_stat = stat(filepath)
+                except OSError:
+                    continue
+                files.append((file_stat.st_mtime, filepath,
+                              file_stat.st_size))
+        cls._files = OrderedDict((filepath, file_size) for _, filepath,
+                                 file_size in sorted(files))
+        cls.n_bytes = sum(cls._files.values())
+
+    @classmethod
+    def touch(
+            cls,
+            filepath: str) -> None:
+        """Mark a saved page image as the most recently used. The lock is to
+        be held."""
+        cls.scan()
+        if filepath not in cls._files:
+            return
+        cls._files.move_to_end(filepath)
+        try:
+            utime(filepath)
+        except OSError:
+            pass
+
+    @classmethod
+    def add(
+            cls,
+            filepath: str,
+            file_size: int) -> None:
+        """Account for a newly saved page image, and remove the least
+        recently used ones beyond `max_bytes`. The lock is to be held."""
+        cls.scan()
+        cls.n_bytes += file_size - cls._files.pop(filepath, 0)
+        cls._files[filepath] = file_size
+        while cls.n_bytes > cls.max_bytes \
+                and cls._files:
+            evicted_filepath, evicted_size = cls._files.popitem(last=False)
+            cls.n_bytes -= evicted_size
+            cls.n_evicted += 1
+            try:
+                remove(evicted_filepath)
+            except OSError:
+                pass
+
+    @classmethod
+    def invalidate(
+            cls,
+            musshaf_name: str) -> None:
+        """Remove the saved pages of a Musshaf, e.g. after it has been
+        downloaded again"""
+        dirpath = cls.get_dirpath(musshaf_name)
+        with cls._lock:
+            rmtree(dirpath, ignore_errors=True)
+            if cls._files is None:
+                return
+            for filepath in list(cls._files):
+                if filepath.startswith(dirpath + path.sep):
+                    cls.n_bytes -= cls._files.pop(filepath)
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            return {'hits': cls.n_hits, 'misses': cls.n_misses,
+                    'saved': cls.n_saved, 'pending': len(cls._pending),
+                    'bytes': cls.n_bytes, 'evicted': cls.n_evicted}
+
+
@@ -15,18 +15,154 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from collections import Counter
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from gi.repository import GLib
 from gi.repository import Gtk
 from gi.repository import GObject
-from os import path
-import itertools
-import re
+from heapq import merge
+from queue import Queue
+from string import ascii_lowercase
+from string import ascii_uppercase
+from threading import Lock
+from threading import Thread
+from time import perf_counter
+from typing import Callable
 
 from . import globals as glob
 from . import constants as const
+from .lafzi import PhoneticIndex
+from .lafzi import latin2phonetic
+from .model import AyahIndex
+from .model import Connection
 from .model import Metadata
+from .model import SearchIndex
 from .model import Tarajem
 
+class SearchCache:
+    """Bounded LRU cache of the final search results
+
+    The results are keyed by the query and everything else they depend on,
+    i.e. the options, the Musshaf and the selected tarajem. The query is only
+    normalised in ways that cannot change the results: since every backend
+    ignores the case of latin letters, they are lowercased unless the case is
+    to be matched.
+    """
+
+    max_size: int = 64
+
+    _results: OrderedDict = OrderedDict()
+    _lock = Lock()
+    _version: int = 0  # increased on invalidation, so that results being
+                       # searched meanwhile are not cached
+    n_hits: int = 0
+    n_misses: int = 0
+
+    _lowercase_table = str.maketrans(ascii_uppercase, ascii_lowercase)
+
+    @classmethod
+    def get_key(
+            cls,
+            query: str,
+            match_case: bool,
+            match_whole_word: bool,
+            musshaf_name: str,
+            tarajem_names: list) -> tuple:
+        if not match_case:
+            query = query.translate(cls._lowercase_table)
+        return (query, match_case, match_whole_word, musshaf_name,
+                tuple(sorted(tarajem_names)))
+
+    @classmethod
+    def get(
+            cls,
+            key: tuple) -> tuple:
+        """Return the cached results and the cache version
+
+        The results are None if not cached. The version is to be given back
+        to `put()`.
+        """
+        with cls._lock:
+            results = cls._results.get(key)
+            if results is None:
+                cls.n_misses += 1
+            else:
+                cls.n_hits += 1
+                cls._results.move_to_end(key)
+            return results, cls._version
+
+    @classmethod
+    def put(
+            cls,
+            key: tuple,
+            results: list,
+            version: int) -> None:
+        with cls._lock:
+            if version != cls._version:
+                return
+            cls._results[key] = results
+            cls._results.move_to_end(key)
+            while len(cls._results) > cls.max_size:
+                cls._results.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Forget all results, e.g. after a tarajem has been (re)indexed"""
+        with cls._lock:
+            cls._results.clear()
+            cls._version += 1
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with cls._lock:
+            return {'hits': cls.n_hits, 'misses': cls.n_misses,
+                    'size': len(cls._results)}
+
+
+class SearchSession:
+    """What the last search has found, to narrow down the next one
+
+    While the options are unchanged, a query extending the last one can only
+    match fewer texts in a full-text index, i.e. a subset of what the last one
+    has matched, unless the whole words are to be matched. So an index which
+    has matched nothing is not searched again until the query is shortened.
+    The phonetic search is only repeated if the extended query is
+    transliterated differently, e.g. not when a letter is doubled.
+    """
+
+    def __init__(
+            self,
+            options: tuple,
+            query: str = '') -> None:
+        self.options = options  # (match_case, match_whole_word, musshaf_name,
+                                #  tarajem_names)
+        self.query = query
+        self.empty_indexes = set()
+        self.phonetic_query = None
+        self.phonetic_results = []
+
+    def is_empty(
+            self,
+            index_name: str,
+            query: str) -> bool:
+        """Whether the index is known to have no match for the query"""
+        match_whole_word = self.options[1]
+        if match_whole_word \
+                or not query.startswith(self.query):
+            return False
+        return index_name in self.empty_indexes
+
+    def set_empty(
+            self,
+            index_name: str) -> None:
+        # A query without any word matches nothing, but it says nothing about
+        # the queries extending it
+        if any(c.isalnum() for c in self.query):
+            self.empty_indexes.add(index_name)
+
+
 @Gtk.Template(resource_path=f'{const.RESOURCE_PATH}/ui/search_popover.ui')
 class SearchPopover(Gtk.PopoverMenu):
     __gtype_name__ = 'SearchPopover'
@@ -45,114 +181,465 @@ class SearchPopover(Gtk.PopoverMenu):
     match_case: bool = False
     match_whole_word: bool = False
 
+    n_rows: int = 0  # of the results which have been added to the list
+    n_timed_out: int = 0  # of the tarajem whose results are displayed partly
+    n_rows_per_batch: int = 20  # to fill the visible list with some margin
+    debounce_delay: int = 150  # in milliseconds, on top of the delay of the
+                               # search entry itself
+    debounce_id: int = 0
+
+    generation: int = 0  # increased by every new search, so that the older
+                         # ones still in flight can tell they are superseded
+    jobs: Queue = None
+    session: SearchSession = None  # of the last completed search
+    timings: deque = None  # of (query, seconds) of the last searches
+
+    executor: ThreadPoolExecutor = None  # to search the tarajem concurrently
+    tarajem_timeout: float = 1.0  # in seconds, for all tarajem together
+    tarajem_timings: dict = None  # in seconds by tarajem ID of the last
+                                  # search, or None if it has timed out or
+                                  # failed
+    n_searched: int = 0
+    n_cancelled: int = 0
+    _lock = Lock()
+
+    def __init__(
+            self,
+            **kwargs) -> None:
+        super().__init__(**kwargs)
+
+        self.jobs = Queue()
+        self.timings = deque(maxlen=100)
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.tarajem_timings = {}
+
+        # Add the rows of the results only as the list is scrolled down
+        adjustment = self.scrolledwindow.get_vadjustment()
+        adjustment.connect('changed', self.on_scrolled)
+        adjustment.connect('value-changed', self.on_scrolled)
+
+        # A single worker is kept for the lifetime of the popover, so that it
+        # can reuse its own database connections from one search to the next
+        Thread(target=self.work, daemon=True).start()
+        self.connect('destroy', self.on_destroyed)
+
     def populate(
             self,
-            query: str = '') -> bool:
-        """Display search results
+            query: str = '') -> None:
+        """Start searching in the background
 
         Search everything including Musshaf unicode texts and tarajem/tafaser
         based on the user's search query. The search query should contain at
-        least three characters.
+        least three characters. The results are displayed by `display()` once
+        the worker has finished, unless a newer search has been started.
         """
-        # TODO: implement substring highlight
         if not query:
             query = self.query
         self.query = query
 
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+
         if len(query) < 3:
             self.scrolledwindow.hide()
             self.note.hide()
             return
 
-        with Metadata() as metadata, \
-             Tarajem() as tarajem:
-            n_search_results = 0
-            max_search_results = 100
+        # Copy whatever the worker would read from the shared state, as it
+        # may change while the search is running
+        self.jobs.put((generation, query, self.match_case,
+                       self.match_whole_word, glob.musshaf_name,
+                       list(glob.tarajem_names)))
 
+    def is_superseded(
+            self,
+            generation: int) -> bool:
+        with self._lock:
+            return generation != self.generation
+
+    def work(self) -> None:
+        """Run the queued searches one by one in the worker thread, until
+        None is queued"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                Connection.close()
+                break
+            generation = job[0]
+
+            start = perf_counter()
+            key = SearchCache.get_key(*job[1:])
+            results, version = SearchCache.get(key)
+            if results is None:
+                # The worker must outlive any failed search, e.g. while the
+                # database is locked, or no other search would ever be run
+                try:
+                    found = self.find(*job)
+                except Exception as error:
+                    print(f'Searching `{job[1]}` has failed: {error}')
+                    found = [], 0
+                if found is None:
+                    with self._lock:
+                        self.n_cancelled += 1
+                    continue
+                results, n_timed_out = found
+                if not n_timed_out:
+                    SearchCache.put(key, results, version)
+            else:
+                n_timed_out = 0
+            elapsed = perf_counter() - start
+
+            GLib.idle_add(self.display, generation, job[1], results, elapsed,
+                          True, n_timed_out)
+
+    def find(
+            self,
+            generation: int,
+            query: str,
+            match_case: bool,
+            match_whole_word: bool,
+            musshaf_name: str,
+            tarajem_names: list) -> tuple:
+        """Return the search results and the number of tarajem which have
+        timed out, or None if superseded by a newer search
+
+        The backends are tried in order and the search is abandoned between
+        any two of them as soon as a newer search has been started.
+        """
+        if self.is_superseded(generation):
+            return None
+
+        options = (match_case, match_whole_word, musshaf_name,
+                   tuple(tarajem_names))
+        session = self.session
+        if session is None \
+                or session.options != options:
+            session = SearchSession(options)
+        next_session = SearchSession(options, query)
+
+        with Metadata() as metadata, \
+             SearchIndex() as index:
             # Search for ayah by imlaei
-            results = metadata.get_ayah_texts(query)
+            results = []
+            if not session.is_empty('texts', query):
+                results = index.get_ayah_texts(query, match_case,
+                                               match_whole_word)
+                if not match_whole_word:
+                    # The index only matches the beginning of the words, so
+                    # add the ayahs where the query follows a prefix, e.g.
+                    # the definite article or conjunctions, after the ranked
+                    # ones
+                    surayas = {result[:2] for result in results}
+                    results += [result for result
+                                in metadata.get_ayah_texts(query, match_case)
+                                if result[:2] not in surayas]
+            if not results:
+                next_session.set_empty('texts')
 
             if not results:
-                # Search for ayah by phonetic
-                # TODO: implement cache system
-                query_phonetic = self.latin2phonetic(query)
-                matched_docs = self.search_phonetic(query_phonetic, 0.9)
-                if not matched_docs:
-                    matched_docs = self.search_phonetic(query_phonetic, 0.8)
-                if not matched_docs:
-                    matched_docs = self.search_phonetic(query_phonetic, 0.7)
-                for matched_doc in matched_docs:
-                    results += metadata.get_ayah_text(
-                        glob.musshaf_name, text_id=matched_doc['document-id'])
+                if self.is_superseded(generation):
+                    return None
 
+                # Search for ayah by phonetic
+                query_phonetic = latin2phonetic(query)
+                if query_phonetic == session.phonetic_query:
+                    results += session.phonetic_results
+                else:
+                    matched_docs = PhoneticIndex.get().search(
+                        query_phonetic, (0.9, 0.8, 0.7))
+                    results += metadata.get_ayah_texts_by_ids(
+                        [matched_doc['document-id']
+                         for matched_doc in matched_docs])
+                next_session.phonetic_query = query_phonetic
+                next_session.phonetic_results = list(results)
+
+            n_timed_out = 0
             if not results:
-                # Search for tarajem/tafaser
-                for tarajem_name in glob.tarajem_names:
-                    results_tarajem = tarajem.get_tarajem_texts(
-                        tarajem_name, query, self.match_case,
-                        self.match_whole_word)
-                    results += results_tarajem
-
-            # Compare to the previous displayed list. If they are the same,
-            # do not update the display. Otherwise, save current list.
-            n_search_results = len(results)
-            results = results[:max_search_results]
-            if self.results == results:
-                return
-            self.results = results
-
-            def reset(row: Gtk.ListBoxRow) -> None:
-                self.listbox.remove(row)
-            self.listbox.foreach(reset)
-
-            for result in self.results:
-                text = \
-                    '<span>' \
-                        f'{result[-1]}' \
-                    '</span>'
-                label =  \
-                    '<span size="small">' \
-                        f'Found in Surah {metadata.get_surah_name(result[0])} ' \
-                        f'({result[0]}) Ayah {result[1]}' \
-                    '</span>'
-                row = SearchListBoxRow(text, label)
-                row.id = (result[0], result[1])
-                self.listbox.add(row)
-
-            if n_search_results == 0:
-                self.note.set_markup(
-                    '<span size="small" foreground="#808080808080">'
-                        'No search result'
-                    '</span>')
-                self.scrolledwindow.hide()
+                # Search for tarajem/tafaser, displaying the results of every
+                # tarajem as soon as it has been searched
+                def display_partially(results: list) -> None:
+                    GLib.idle_add(self.display, generation, query,
+                                  self.join(results, musshaf_name, metadata),
+                                  0, False)
+
+                found = self.find_tarajem(generation, query, match_case,
+                                          match_whole_word, tarajem_names,
+                                          session, next_session,
+                                          display_partially)
+                if found is None:
+                    return None
+                results, n_timed_out = found
+
+            results = self.join(results, musshaf_name, metadata)
+
+        self.session = next_session
+        return results, n_timed_out
+
+    def find_tarajem(
+            self,
+            generation: int,
+            query: str,
+            match_case: bool,
+            match_whole_word: bool,
+            tarajem_names: list,
+            session: SearchSession,
+            next_session: SearchSession,
+            on_partial_results: Callable) -> tuple:
+        """Search all tarajem concurrently, merging their results by rank
+
+        Return the results and the number of tarajem which have timed out, or
+        None if superseded by a newer search. Every time a tarajem has been
+        searched but the last, `on_partial_results()` is called with the
+        results so far. All tarajem share `tarajem_timeout`, so that a huge
+        tafsir is cut off rather than delaying the others; what it has
+        matched by then is kept, after the ranked results of the others. A
+        failed tarajem, e.g. while its database is locked, is counted as
+        timed out with no result. The tarajem with
+        no index yet, i.e. downloaded by the previous versions, are indexed
+        beforehand, one after the other.
+        """
+        with SearchIndex() as index:
+            index.create_missing_tarajem_indexes(tarajem_names)
+        if self.is_superseded(generation):
+            return None
+
+        deadline = perf_counter() + self.tarajem_timeout
+
+        def is_interrupted() -> bool:
+            return perf_counter() > deadline \
+                or self.is_superseded(generation)
+
+        def search(tarajem_name: str) -> tuple:
+            start = perf_counter()
+            if match_whole_word:
+                # The exact words are checked by REGEXP, after the index
+                with Tarajem() as tarajem:
+                    results = tarajem.get_tarajem_texts(
+                        tarajem_name, query, match_case, match_whole_word,
+                        with_rank=True, is_interrupted=is_interrupted)
             else:
-                self.note.set_markup(
-                    '<span size="small" foreground="#808080808080">'
-                        'Displaying search results '
-                        f'{min(max_search_results, n_search_results)} '
-                        f'of {n_search_results}'
-                    '</span>')
-                self.scrolledwindow.show()
+                with SearchIndex() as index:
+                    results = index.get_tarajem_texts(
+                        tarajem_name, query, match_case, match_whole_word,
+                        with_rank=True, is_interrupted=is_interrupted)
+                # The index only matches the beginning of the words, so add
+                # the texts where the query is within a word after the ranked
+                # ones
+                surayas = {result[:2] for result in results}
+                with Tarajem() as tarajem:
+                    results += [result for result
+                                in tarajem.get_tarajem_texts(
+                                    tarajem_name, query, match_case,
+                                    with_rank=True,
+                                    is_interrupted=is_interrupted)
+                                if result[:2] not in surayas]
+            return tarajem_name, results, perf_counter() - start, \
+                is_interrupted()
+
+        futures = {}
+        for tarajem_name in tarajem_names:
+            if session.is_empty(tarajem_name, query):
+                next_session.set_empty(tarajem_name)
+            else:
+                futures[self.executor.submit(search, tarajem_name)] = \
+                    tarajem_name
+
+        results = []
+        timings = {}
+        for n_searched, future in enumerate(as_completed(futures), 1):
+            # A failed tarajem is skipped like a timed out one, keeping the
+            # results of the others
+            try:
+                tarajem_name, results_tarajem, elapsed, is_timed_out = \
+                    future.result()
+            except Exception as error:
+                print(f'Searching the tarajem ID `{futures[future]}` has '
+                      f'failed: {error}')
+                timings[futures[future]] = None
+                continue
+            timings[tarajem_name] = None if is_timed_out else elapsed
+            # An interrupted search might have matched something
+            if not results_tarajem \
+                    and not is_timed_out:
+                next_session.set_empty(tarajem_name)
+            if is_timed_out:
+                # Its ranks are not comparable to the others', as its best
+                # matches may not have been found
+                results_tarajem = [result[:3] + (float('inf'),)
+                                   for result in results_tarajem]
+            if results_tarajem:
+                results = list(merge(results, results_tarajem,
+                                     key=lambda result: result[3]))
+                if n_searched < len(futures):
+                    on_partial_results([result[:3] for result in results])
+
+        if self.is_superseded(generation):
+            return None
+        self.tarajem_timings = timings
+
+        n_timed_out = list(timings.values()).count(None)
+        return [result[:3] for result in results], n_timed_out
+
+    def join(
+            self,
+            results: list,
+            musshaf_name: str,
+            metadata: Metadata) -> list:
+        """Join every result with its surah name and page number, so that
+        displaying them does not need any query"""
+        index = AyahIndex.get(musshaf_name)
+        page_no_start = index.get_page_no(1, 1)
+        surahs = metadata.get_surahs()
+        return [(surah_no, ayah_no, text, surahs[surah_no-1].tname,
+                 index.get_page_no(surah_no, ayah_no)-page_no_start+1)
+                for surah_no, ayah_no, text in results]
+
+    def display(
+            self,
+            generation: int,
+            query: str,
+            results: list,
+            elapsed: float,
+            is_final: bool = True,
+            n_timed_out: int = 0) -> bool:
+        """Display search results
+
+        Run in the main thread. Results of a superseded search are dropped.
+        The partial results are displayed while the rest is being searched.
+        The note tells how many tarajem have timed out, whose results are
+        incomplete.
+        """
+        # TODO: implement substring highlight
+        with self._lock:
+            if generation != self.generation:
+                if is_final:
+                    self.n_cancelled += 1
+                return False
+            if is_final:
+                self.n_searched += 1
+                self.timings.append((query, elapsed))
+
+        # Compare to the previous displayed list. If they are the same,
+        # do not update the display. Otherwise, save current list.
+        if self.results == results \
+                and self.n_timed_out == n_timed_out:
+            self.scrolledwindow.set_visible(len(results) > 0)
             self.note.show()
+            return False
+        self.results = results
+        self.n_rows = 0
+        self.n_timed_out = n_timed_out
+
+        def reset(row: Gtk.ListBoxRow) -> None:
+            self.listbox.remove(row)
+        self.listbox.foreach(reset)
+
+        if not self.results:
+            self.set_note('No search result')
+            self.scrolledwindow.hide()
+        else:
+            self.add_rows()
+            self.scrolledwindow.get_vadjustment().set_value(0)
+            self.scrolledwindow.show()
+        self.note.show()
 
         self.listbox.show_all()
 
-        if self.listbox.get_children():
-            return True
+        return False  # run once when called by `GLib.idle_add()`
+
+    def add_rows(self) -> None:
+        """Add the next batch of the results to the list"""
+        n_rows = min(self.n_rows + self.n_rows_per_batch, len(self.results))
+        for surah_no, ayah_no, text, surah_name, page_no \
+                in self.results[self.n_rows:n_rows]:
+            text = \
+                '<span>' \
+                    f'{text}' \
+                '</span>'
+            label =  \
+                '<span size="small">' \
+                    f'Found in Surah {surah_name} ({surah_no}) ' \
+                    f'Ayah {ayah_no}, Page No. {page_no}' \
+                '</span>'
+            row = SearchListBoxRow(text, label)
+            row.id = (surah_no, ayah_no)
+            self.listbox.add(row)
+        self.n_rows = n_rows
+
+        self.set_note(f'Displaying search results {self.n_rows} of '
+                      f'{len(self.results)}')
+
+    def set_note(
+            self,
+            text: str) -> None:
+        if self.n_timed_out:
+            text = f'{text}, {self.n_timed_out} tarajem timed out'
+        self.note.set_markup(
+            '<span size="small" foreground="#808080808080">'
+                f'{text}'
+            '</span>')
+
+    def on_scrolled(
+            self,
+            adjustment: Gtk.Adjustment) -> None:
+        if not self.results \
+                or self.n_rows >= len(self.results):
+            return
+
+        # Keep at least another page of rows below the visible ones. Adding
+        # them changes the adjustment again, so the list is filled up until
+        # then.
+        bottom = adjustment.get_value() + adjustment.get_page_size()
+        if bottom + adjustment.get_page_size() >= adjustment.get_upper():
+            self.add_rows()
+
+    def on_destroyed(
+            self,
+            popover: Gtk.PopoverMenu) -> None:
+        # Supersede the search in flight, if any, so that nothing is displayed
+        # anymore, then stop the worker and the threads searching the tarajem
+        # once they are done
+        with self._lock:
+            self.generation += 1
+        self.jobs.put(None)
+        self.executor.shutdown(wait=False)
+
+    def get_stats(self) -> dict:
+        """Return the number of searches and how long the last ones took,
+        also by tarajem for the last search of tarajem"""
+        with self._lock:
+            timings = list(self.timings)
+            stats = {'searched': self.n_searched,
+                     'cancelled': self.n_cancelled,
+                     'last': timings[-1][1] if timings else 0,
+                     'mean': sum(t for _, t in timings) / len(timings)
+                             if timings else 0,
+                     'tarajem': dict(self.tarajem_timings)}
+        return stats
+
+    def search_debounced(self) -> bool:
+        self.debounce_id = 0
+        self.populate()
         return False
 
     @Gtk.Template.Callback()
     def search(
             self,
             entry: Gtk.SearchEntry) -> None:
-        query = entry.get_text()
-        self.populate(query)
+        # Wait for the user to pause typing before searching
+        self.query = entry.get_text()
+        if self.debounce_id:
+            GLib.source_remove(self.debounce_id)
+        self.debounce_id = GLib.timeout_add(self.debounce_delay,
+                                            self.search_debounced)
 
     @Gtk.Template.Callback()
     def match_case_toggled(
             self,
             toggle: Gtk.ToggleButton) -> None:
         self.match_case = toggle.get_active()
+        self.session = None
         self.populate()
 
     @Gtk.Template.Callback()
@@ -160,6 +647,7 @@ class SearchPopover(Gtk.PopoverMenu):
             self,
             toggle: Gtk.ToggleButton) -> None:
         self.match_whole_word = toggle.get_active()
+        self.session = None
         self.populate()
 
     @Gtk.Template.Callback()
@@ -171,155 +659,6 @@ class SearchPopover(Gtk.PopoverMenu):
             return
         self.emit('go-to-suraya', *listboxrow.id)
 
-    def latin2phonetic(
-            self,
-            latin_text: str) -> str:
-        # Normalise the latin text
-        # make all characters capitalized
-        latin_text = latin_text.upper()
-
-        # replace strips with spaces
-        latin_text = latin_text.replace('-', ' ')
-
-        # remove non-alphabetic characters except ampersands and spaces
-        latin_text = re.sub(r"[^A-Z'`\&\s]", '', latin_text)
-
-        # Transform the latin text
-        # remove repeated adjacent characters
-        latin_text = ''.join(c[0] for c in itertools.groupby(latin_text))
-
-        # remove duplicate adjacent two-letter-consonants
-        latin_text = re.sub(r'(KH|CH|SH|TS|SY|DH|TH|ZH|DH|DZ|GH)+', r'\1',
-                            latin_text)
-
-        # replace the letters O and E since they are not in arabic
-        latin_text = latin_text.replace('O', 'A')
-        latin_text = latin_text.replace('E', 'I')
-
-        # replace the diphthong from non-Arabic to Arabic
-        latin_text = latin_text.replace('AI', 'AY')
-        latin_text = latin_text.replace('AU', 'AW')
-
-        # mark the hamzas
-        latin_text = re.sub(r'^(A|I|U)+', r'X\1', latin_text)
-        latin_text = latin_text.replace(' A', ' XA')
-        latin_text = latin_text.replace(' I', ' XI')
-        latin_text = latin_text.replace(' U', ' XU')
-        latin_text = latin_text.replace('IA', 'IXA')
-        latin_text = latin_text.replace('IU', 'IXU')
-        latin_text = latin_text.replace('UA', 'UXA')
-        latin_text = latin_text.replace('UI', 'UXI')
-
-        # replace the ikhfas (NG)
-        latin_text = re.sub(r'(A|I|U)NG\s?(D|F|J|K|P|Q|S|T|V|Z)+', r'\1N\2',
-                            latin_text)
-
-        # replace the iqlabs
-        latin_text = re.sub(r'N\s?B', 'MB', latin_text)
-
-        # replace the idghams
-        latin_text = latin_text.replace('DUNYA', 'DUN_YA')
-        latin_text = latin_text.replace('BUNYAN', 'BUN_YAN')
-        latin_text = latin_text.replace('QINWAN', 'KIN_WAN')
-        latin_text = latin_text.replace('KINWAN', 'KIN_WAN')
-        latin_text = latin_text.replace('SINWAN', 'SIN_WAN')
-        latin_text = latin_text.replace('SHINWAN', 'SIN_WAN')
-        latin_text = re.sub(r'N\s?(N|M|L|R|Y|W)+', r'\1', latin_text)
-        latin_text = latin_text.replace('DUN_YA', 'DUNYA')
-        latin_text = latin_text.replace('BUN-YAN', 'BUNYAN')
-        latin_text = latin_text.replace('KIN_WAN', 'KINWAN')
-        latin_text = latin_text.replace('SIN_WAN', 'SINWAN')
-
-        # replace two-letter-consonants
-        latin_text = latin_text.replace('KH', 'H')
-        latin_text = latin_text.replace('CH', 'H')
-        latin_text = latin_text.replace('SH', 'S')
-        latin_text = latin_text.replace('TS', 'S')
-        latin_text = latin_text.replace('SY', 'S')
-        latin_text = latin_text.replace('DH', 'D')
-        latin_text = latin_text.replace('ZH', 'Z')
-        latin_text = latin_text.replace('DZ', 'Z')
-        latin_text = latin_text.replace('TH', 'T')
-        latin_text = latin_text.replace('NGA', 'XNGA')
-        latin_text = latin_text.replace('NGI', 'XNGI')
-        latin_text = latin_text.replace('NGU', 'XNGU')
-        latin_text = latin_text.replace('GH', 'G')
-
-        # replace one-letter-consonants
-        latin_text = latin_text.replace('GH', 'G')
-        latin_text = latin_text.replace("'", 'X')
-        latin_text = latin_text.replace("`", 'X')
-        latin_text = latin_text.replace("Q", 'K')
-        latin_text = latin_text.replace("K", 'K')
-        latin_text = latin_text.replace("F", 'F')
-        latin_text = latin_text.replace("V", 'F')
-        latin_text = latin_text.replace("P", 'F')
-        latin_text = latin_text.replace("J", 'Z')
-        latin_text = latin_text.replace("Z", 'Z')
-
-        # remove spaces
-        latin_text = latin_text.replace(' ', '')
-
-        return latin_text
-
-    def search_phonetic(
-            self,
-            query: str,
-            threshold: float = 0.8) -> list:
-        module_dirpath = path.dirname(path.abspath(__file__))
-        termlist_filepath = path.join(module_dirpath, 'lafzi_termlist.txt')
-        postlist_filepath = path.join(module_dirpath, 'lafzi_postlist.txt')
-
-        with open(termlist_filepath, 'r') as termlist_file, \
-             open(postlist_filepath, 'r') as postlist_file:
-            # create tri-grams from the query
-            if len(query) == 3:
-                trigrams = [query]
-            else:
-                trigrams = [query[i:i+3] for i in range(len(query) - 2)]
-
-            # count each tri-gram occurence frequencies
-            term_frequencies = Counter(trigrams).most_common()
-            trigrams = {}
-            for term, frequency in term_frequencies:
-                position = query.index(term)
-                trigrams[term] = (frequency, position)
-
-            #
-            termlist = {}
-            for line in termlist_file:
-                key, value = line.split('|')
-                termlist[key] = int(value)
-
-            #
-            matched_docs = {}
-            for term, (frequency, position) in trigrams.items():
-                if term not in termlist:
-                    continue
-                postlist_file.seek(termlist[term])
-                matched_postlists = postlist_file.readline().split(';')
-                for postlist in matched_postlists:
-                    document_id, term_frequency, term_position = \
-                        postlist.split(':')
-                    term_position = term_position.split(',')
-                    if document_id in matched_docs:
-                        matched_docs[document_id]['matched-trigrams-count'] += \
-                            min(frequency, int(term_frequency))
-                    else:
-                        matched_docs[document_id] = {
-                            'document-id': document_id,
-                            'matched-trigrams-count': 1,
-                            'matched-terms': {}}
-                    matched_docs[document_id]['matched-terms'][term] = \
-                        term_position
-
-            # Filter matched documents by a given threshold
-            min_score = threshold * (len(query) - 2)
-            filtered_docs = [doc for doc in matched_docs.values()
-                             if doc['matched-trigrams-count'] >= min_score]
-
-            return filtered_docs
-
 
 @Gtk.Template(resource_path=f'{const.RESOURCE_PATH}/ui/search_listboxrow.ui')
 class SearchListBoxRow(Gtk.ListBoxRow):
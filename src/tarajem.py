@@ -26,7 +26,9 @@ from . import constants as const
 from . import globals as glob
 from .animation import Animation
 from .model import Metadata
+from .model import SearchIndex
 from .model import Tarajem
+from .search import SearchCache
 
 
 @Gtk.Template(resource_path=f'{const.RESOURCE_PATH}/ui/tarajem_viewer.ui')
@@ -338,6 +340,11 @@ class TarajemPopover(Gtk.PopoverMenu):
 
                     model.connection.commit()
 
+            # Index the newly downloaded tarajem for searching
+            with SearchIndex() as index:
+                index.create_tarajem_index(tarajem_id)
+            SearchCache.invalidate()
+
             self.progressbar.set_fraction(1)  # in case there is no content
                                               # length in its header
 
@@ -217,10 +217,11 @@ class MainWindow(Handy.ApplicationWindow):
         # Load a sample image page of the opened Musshaf ID by assuming that
         # all image pages have the same size
         image_filepath = path.join(musshaf_dir, '1.jpg')
-        page_image = GdkPixbuf.Pixbuf.new_from_file(image_filepath)
+        _, page_width, page_height = \
+            GdkPixbuf.Pixbuf.get_file_info(image_filepath)
 
-        page_width = round(page_image.get_width() * glob.page_scale)
-        page_height = round(page_image.get_height() * glob.page_scale)
+        page_width = round(page_width * glob.page_scale)
+        page_height = round(page_height * glob.page_scale)
 
         headerbar_size = self.headerbar.get_allocation()
         window_height = page_height + headerbar_size.height